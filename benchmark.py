@@ -0,0 +1,456 @@
+"""Contains benchmarks measuring the performance of the phonebook.
+
+Usage:
+    python benchmark.py match [--count N]
+    python benchmark.py memory [--count N]
+    python benchmark.py validation [--count N]
+    python benchmark.py suite [--sizes 10000,100000,1000000] [--output results.json]
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import tempfile
+import subprocess
+import contextlib
+import tracemalloc
+import random as rnd
+import datetime
+
+import generator
+import input_lib
+from entry import Entry
+from database import Database
+from main import render_page
+from contact_list import ContactList
+from columnar_store import ColumnarStore
+
+
+SEARCHES = ["ann", "all:exam", "#all:555", "org:acme", "add:street", "#add:12", "@:example", "#:49176"]
+
+
+def legacy_match(entry:Entry, search_str:str) -> bool:
+    """The Entry.match implementation without cached search projections. Used as reference.
+    """
+    search_str = search_str.lower()
+    parts = []
+
+    if search_str.startswith("all:") or search_str.startswith("#all:"):
+        parts.append(entry.personals.organisation.lower())
+        parts.append(entry.private.address.city.lower())
+        parts.append(entry.private.address.country.lower())
+        parts.append(entry.private.address.state.lower())
+        parts.append(entry.private.address.street.lower())
+        parts.append(entry.work.address.city.lower())
+        parts.append(entry.work.address.country.lower())
+        parts.append(entry.work.address.state.lower())
+        parts.append(entry.work.address.street.lower())
+        parts.append(entry.private.email.lower())
+        parts.append(entry.work.email.lower())
+
+        if search_str.startswith("#all:"):
+            parts.append(str(entry.private.address.number).lower())
+            parts.append(str(entry.private.address.zip_code).lower())
+            parts.append(str(entry.work.address.number).lower())
+            parts.append(str(entry.work.address.zip_code).lower())
+            parts.append(str(entry.private.phone).lower())
+            parts.append(str(entry.private.mobile).lower())
+            parts.append(str(entry.private.fax).lower())
+            parts.append(str(entry.work.phone).lower())
+            parts.append(str(entry.work.mobile).lower())
+            parts.append(str(entry.work.fax).lower())
+            search_str = search_str[5:]
+        else:
+            search_str = search_str[4:]
+
+    elif search_str.startswith("org:"):
+        parts.append(entry.personals.organisation.lower())
+        search_str = search_str[4:]
+
+    elif search_str.startswith("add:") or search_str.startswith("#add:"):
+        parts.append(entry.private.address.city.lower())
+        parts.append(entry.private.address.country.lower())
+        parts.append(entry.private.address.state.lower())
+        parts.append(entry.private.address.street.lower())
+        parts.append(entry.work.address.city.lower())
+        parts.append(entry.work.address.country.lower())
+        parts.append(entry.work.address.state.lower())
+        parts.append(entry.work.address.street.lower())
+
+        if search_str.startswith("#add:"):
+            parts.append(str(entry.private.address.number).lower())
+            parts.append(str(entry.private.address.zip_code).lower())
+            parts.append(str(entry.work.address.number).lower())
+            parts.append(str(entry.work.address.zip_code).lower())
+            search_str = search_str[5:]
+        else:
+            search_str = search_str[4:]
+
+    elif search_str.startswith("@:"):
+        parts.append(entry.private.email.lower())
+        parts.append(entry.work.email.lower())
+        search_str = search_str[2:]
+
+    elif search_str.startswith("#:"):
+        parts.append(str(entry.private.phone).lower())
+        parts.append(str(entry.private.mobile).lower())
+        parts.append(str(entry.private.fax).lower())
+        parts.append(str(entry.work.phone).lower())
+        parts.append(str(entry.work.mobile).lower())
+        parts.append(str(entry.work.fax).lower())
+        search_str = search_str[2:]
+
+    else:
+        parts.append(entry.personals.first_name.lower())
+        parts.append(entry.personals.last_name.lower())
+        parts.append(entry.personals.nickname.lower())
+
+    for part in parts:
+        if search_str in part:
+            return True
+
+    return False
+
+
+def random_entries(count:int, seed:int = 0) -> list[Entry]:
+    """Creates random entries in memory without saving them (see generator.iter_entries).
+
+    Args:
+        count (int): count of entries to create.
+        seed (int, optional): seed of the random generator. Defaults to 0.
+    """
+    return list(generator.iter_entries(count, seed))
+
+
+def bench_match(count:int = 100000) -> dict:
+    """Compares the time per query of Entry.match with the legacy implementation.
+
+    Args:
+        count (int, optional): count of entries to search. Defaults to 100000.
+
+    Returns:
+        dict: milliseconds per query for each search and implementation
+    """
+    entries = random_entries(count)
+    results = {}
+    for search in SEARCHES:
+        start = time.perf_counter()
+        legacy = [entry for entry in entries if legacy_match(entry, search)]
+        legacy_time = time.perf_counter() - start
+        [entry for entry in entries if entry.match(search)] # pylint: disable=expression-not-assigned
+        start = time.perf_counter()
+        cached = [entry for entry in entries if entry.match(search)]
+        cached_time = time.perf_counter() - start
+        if len(legacy) != len(cached):
+            raise AssertionError(f"Results of \"{search}\" differ: {len(legacy)} != {len(cached)}")
+        results[search] = {
+            "matches": len(cached),
+            "legacy_ms": legacy_time * 1000,
+            "cached_ms": cached_time * 1000
+        }
+    return results
+
+
+class _LegacyObject:
+    """Plain object storing its attributes inside a per-instance __dict__.
+    """
+    def __init__(self, **values) -> None:
+        for name, value in values.items():
+            setattr(self, name, value)
+
+
+class _LegacyAddress(_LegacyObject):
+    pass
+
+
+class _LegacyContact(_LegacyObject):
+    pass
+
+
+class _LegacyPersonals(_LegacyObject):
+    pass
+
+
+class _LegacyEntry(_LegacyObject):
+    pass
+
+
+def legacy_layout(dictionary:dict) -> _LegacyEntry:
+    """Builds the object tree of an entry with one per-instance __dict__ for every object,
+    like the Entry, Personals, Contact and Address classes did before they used __slots__.
+    """
+    def contact(data:dict) -> _LegacyContact:
+        return _LegacyContact(
+            phone=data["phone"], mobile=data["mobile"], fax=data["fax"], email=data["email"],
+            address=_LegacyAddress(**data["address"])
+        )
+    personals = dict(dictionary["personals"])
+    personals["birthday"] = datetime.date(*personals["birthday"])
+    return _LegacyEntry(
+        file="",
+        personals=_LegacyPersonals(**personals),
+        private=contact(dictionary["private"]),
+        work=contact(dictionary["work"]),
+        notes=list(dictionary["notes"]),
+        _projections={}
+    )
+
+
+def bench_memory(count:int = 100000) -> dict:
+    """Measures the memory used per entry by the current classes and by the legacy layout.
+    The entries are decoded from JSON like they are when loading a phonebook.
+
+    Args:
+        count (int, optional): count of entries to create. Defaults to 100000.
+
+    Returns:
+        dict: bytes per entry for each layout
+    """
+    records = [json.dumps(entry.to_dict()) for entry in random_entries(count)]
+    results = {}
+    for name, factory in [("legacy", legacy_layout), ("current", lambda record: Entry.from_dict(record, ""))]:
+        tracemalloc.start()
+        start, _ = tracemalloc.get_traced_memory()
+        objects = [factory(json.loads(record)) for record in records]
+        end, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results[name] = (end - start) / len(objects)
+        del objects
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    store = ColumnarStore()
+    for index, record in enumerate(records):
+        store.append(Entry.from_dict(json.loads(record), str(index)))
+    store.sort()
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    results["columnar"] = (end - start) / len(records)
+    return results
+
+
+def adversarial_inputs(length:int) -> dict:
+    """Returns hostile E-Mail addresses and phone numbers of at most the given length.
+    They are built to make the regular expressions of the input_lib try many ways to match.
+    Only inputs up to MAX_EMAIL_LENGTH or MAX_PHONE_NR_LENGTH reach the regular expressions
+    of the validators, longer ones get rejected by their length.
+    """
+    domain = "@example.com"
+    return {
+        "email: one-char labels": ("email", "a@" + "a." * ((length - 3) // 2) + "1"),
+        "email: unbalanced quotes": ("email", "\"" + "a\"" * ((length - len(domain) - 2) // 2) + "a" + domain),
+        "email: dotted local part": ("email", "a." * ((length - len(domain)) // 2) + domain),
+        "email: quoted local parts": ("email", "\"" + "\"@a." * ((length - 2) // 4) + "!"),
+        "phone: digits": ("phone", "1" * length),
+        "phone: separators": ("phone", ("123-" * length)[:length])
+    }
+
+
+def bench_validation(count:int = 100000, lengths:tuple = (16, 32, 64, 128, 254, 1000, 10000, 100000)) -> dict:
+    """Compares the regular expressions of the input_lib with the linear-time validators.
+    Measures the worst case on adversarial inputs of growing length and the throughput of validate_column.
+    The growth compares the time of the longest input within the length limit of the validator
+    with the time of the shortest one.
+
+    Args:
+        count (int, optional): count of values per column. Defaults to 100000.
+        lengths (tuple, optional): lengths of the adversarial inputs. Defaults to (16, 32, 64, 128, 254, 1000, 10000, 100000).
+
+    Returns:
+        dict: milliseconds per adversarial input, their growth and milliseconds per column for each implementation
+    """
+    validators = {
+        "email": (input_lib.EMAIL_REX, input_lib.is_email),
+        "phone": (input_lib.PHONE_NR_REX, input_lib.is_phone_number)
+    }
+    limits = {"email": input_lib.MAX_EMAIL_LENGTH, "phone": input_lib.MAX_PHONE_NR_LENGTH}
+    adversarial = {}
+    growth = {}
+    for length in lengths:
+        repeat = max(1, 10000 // length)
+        for name, (kind, value) in adversarial_inputs(length).items():
+            rex, validator = validators[kind]
+            adversarial.setdefault(name, {})[len(value)] = {
+                "regex_ms": _timed(lambda: [rex.match(value) for _ in range(repeat)])[1] / repeat,
+                "validator_ms": _timed(lambda: [validator(value) for _ in range(repeat)])[1] / repeat
+            }
+    for name, by_length in adversarial.items():
+        limit = limits[name.split(":")[0]]
+        checked = sorted(length for length in by_length if length <= limit)
+        if len(checked) > 1:
+            shortest, longest = by_length[checked[0]], by_length[checked[-1]]
+            growth[name] = {
+                "from": checked[0],
+                "to": checked[-1],
+                "regex": longest["regex_ms"] / max(shortest["regex_ms"], 1e-9),
+                "validator": longest["validator_ms"] / max(shortest["validator_ms"], 1e-9)
+            }
+    entries = random_entries(count)
+    columns = {
+        "email": [entry.private.email for entry in entries],
+        "phone": [entry.private.mobile for entry in entries]
+    }
+    throughput = {}
+    for kind, values in columns.items():
+        rex, validator = validators[kind]
+        throughput[kind] = {
+            "regex_ms": _timed(lambda: [i for i, value in enumerate(values) if rex.match(value) is None])[1],
+            "validator_ms": _timed(lambda: input_lib.validate_column(values, validator))[1]
+        }
+    return {"adversarial": adversarial, "growth": growth, "columns": throughput}
+
+
+def _timed(function) -> tuple:
+    """Calls a function and returns its result and the time it took in milliseconds.
+    """
+    start = time.perf_counter()
+    result = function()
+    return (result, (time.perf_counter() - start) * 1000)
+
+
+def _quiet(function):
+    """Calls a function while discarding everything it prints.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function()
+
+
+def _first_page(database:Database, search:str):
+    """Renders the first list view page of a lazy search and returns its cursor.
+    """
+    cursor = database.search_lazy(search)
+    cursor.wait(20)
+    render_page(cursor, 0, 10)
+    return cursor
+
+
+def bench_phonebook(count:int, save_count:int = 1000, page_count:int = 50) -> dict:
+    """Times the operations of the phonebook on a synthetic phonebook inside a temporary folder.
+
+    Args:
+        count (int): count of entries of the phonebook.
+        save_count (int, optional): count of entries to save again. Defaults to 1000.
+        page_count (int, optional): count of list view pages to render. Defaults to 50.
+
+    Returns:
+        dict: milliseconds of each operation
+    """
+    results = {"entries": count}
+    old_home = os.environ.get("HOME")
+    old_profile = os.environ.get("USERPROFILE")
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home
+        os.environ["USERPROFILE"] = home
+        try:
+            _, results["write_ms"] = _timed(lambda: generator.generate(count))
+            _, results["init_ms"] = _timed(lambda: _quiet(lambda: Database(use_index=False)))
+            _quiet(lambda: Database(use_index=True))
+            database, results["init_indexed_ms"] = _timed(lambda: _quiet(lambda: Database(use_index=True)))
+            entries = list(database.contacts)
+
+            results["match_ms"] = {}
+            results["search_ms"] = {}
+            results["first_page_ms"] = {}
+            for search in SEARCHES:
+                _, cold = _timed(lambda: [entry for entry in entries if entry.match(search)])
+                _, warm = _timed(lambda: [entry for entry in entries if entry.match(search)])
+                results["match_ms"][search] = {"cold": cold, "warm": warm}
+                _, results["search_ms"][search] = _timed(lambda: database.search(search))
+                cursor, results["first_page_ms"][search] = _timed(lambda: _first_page(database, search))
+                cursor.close()
+
+            _, results["sort_ms"] = _timed(lambda: ContactList((entry.sort_key(), entry) for entry in entries))
+
+            sample = rnd.Random(0).sample(entries, min(save_count, len(entries)))
+            _, save_time = _timed(lambda: [entry.save() for entry in sample])
+            results["save_ms_per_entry"] = save_time / max(1, len(sample))
+
+            page_size = 10
+            pages = max(1, len(entries) // page_size)
+            rendered = [int(pages * i / page_count) for i in range(page_count)]
+            _, render_time = _timed(lambda: [render_page(database.contacts, page, page_size) for page in rendered])
+            results["render_page_ms"] = render_time / page_count
+        finally:
+            for name, value in [("HOME", old_home), ("USERPROFILE", old_profile)]:
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+    return results
+
+
+def bench_suite(sizes:list[int]) -> dict:
+    """Runs bench_phonebook for each phonebook size.
+
+    Args:
+        sizes (list[int]): counts of entries of the phonebooks.
+
+    Returns:
+        dict: the results together with the commit and python version they where measured with
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "python": sys.version.split(" ")[0],
+        "time": datetime.datetime.now().isoformat(timespec="seconds"),
+        "results": [bench_phonebook(size) for size in sizes]
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    def main():
+        """Runs the benchmarks from the command line.
+        """
+        parser = argparse.ArgumentParser(description="Benchmarks of the phonebook.")
+        parser.add_argument("benchmark", choices=["match", "memory", "validation", "suite"])
+        parser.add_argument("--count", type=int, default=100000, help="count of entries")
+        parser.add_argument("--sizes", default="10000,100000,1000000", help="comma separated phonebook sizes of the suite")
+        parser.add_argument("--output", help="file to write the results of the suite to (default: stdout)")
+        args = parser.parse_args()
+        if args.benchmark == "match":
+            print(f"Entry.match on {args.count} entries (ms per query):")
+            for search, result in bench_match(args.count).items():
+                print(
+                    f"  {search:12} {result['matches']:8} matches   legacy: {result['legacy_ms']:8.1f}" +
+                    f"   cached: {result['cached_ms']:8.1f}   ({result['legacy_ms'] / result['cached_ms']:.1f}x)"
+                )
+        elif args.benchmark == "memory":
+            results = bench_memory(args.count)
+            print(f"Memory per entry on {args.count} entries:")
+            print(f"  legacy layout:  {results['legacy']:8.0f} bytes")
+            print(f"  current layout: {results['current']:8.0f} bytes")
+            print(f"  columnar store: {results['columnar']:8.0f} bytes")
+        elif args.benchmark == "validation":
+            results = bench_validation(args.count)
+            print("Worst case on adversarial input (ms per value):")
+            for name, by_length in results["adversarial"].items():
+                for length, result in by_length.items():
+                    print(
+                        f"  {name:28} {length:7} chars   regex: {result['regex_ms']:9.4f}" +
+                        f"   validator: {result['validator_ms']:9.4f}"
+                    )
+            print("Growth within the length limits of the validators:")
+            for name, result in results["growth"].items():
+                print(
+                    f"  {name:28} {result['from']:4} to {result['to']:4} chars ({result['to'] / result['from']:.1f}x longer)" +
+                    f"   regex: {result['regex']:7.1f}x   validator: {result['validator']:5.1f}x"
+                )
+            print(f"validate_column on {args.count} values (ms per column):")
+            for kind, result in results["columns"].items():
+                print(f"  {kind:6} regex: {result['regex_ms']:8.1f}   validator: {result['validator_ms']:8.1f}")
+        elif args.benchmark == "suite":
+            results = bench_suite([int(size) for size in args.sizes.split(",")])
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as output:
+                    json.dump(results, output, indent=2)
+            else:
+                print(json.dumps(results, indent=2))
+    main()
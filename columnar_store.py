@@ -0,0 +1,339 @@
+"""Contains a column oriented in-memory store for very large phonebooks.
+
+Instead of one Entry, one Personals, two Contact and two Address objects per contact the store
+keeps every field as a column: all values of a string field are joined into one string separated
+by null characters with an array of offsets, birthdays are kept as an array of ordinals.
+Entry objects only get created for the rows that are displayed or edited.
+"""
+
+import json
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+from entry import Entry, Personals, Contact, Address, SEARCH_SCOPES, split_search, normalize_phone, email_matches, NO_BIRTHDAY
+
+
+SEPARATOR = "\x00"
+NO_BIRTHDAY_ORDINAL = NO_BIRTHDAY.toordinal()
+
+PERSONAL_FIELDS = ("first_name", "last_name", "title", "nickname", "organisation")
+CONTACT_FIELDS = ("phone", "mobile", "fax", "email")
+ADDRESS_FIELDS = ("street", "number", "zip_code", "city", "state", "country")
+STRING_FIELDS = (
+    ["file", "notes"] +
+    ["personals." + field for field in PERSONAL_FIELDS] +
+    [kind + "." + field for kind in ("private", "work") for field in CONTACT_FIELDS] +
+    [kind + ".address." + field for kind in ("private", "work") for field in ADDRESS_FIELDS]
+)
+GROUP_FIELDS = {
+    "name": ["personals.first_name", "personals.last_name", "personals.nickname"],
+    "organisation": ["personals.organisation"],
+    "address": [kind + ".address." + field for kind in ("private", "work") for field in ("city", "country", "state", "street")],
+    "address_numbers": [kind + ".address." + field for kind in ("private", "work") for field in ("number", "zip_code")],
+    "email": ["private.email", "work.email"],
+    "phone": [kind + "." + field for kind in ("private", "work") for field in ("phone", "mobile", "fax")]
+}
+"""The fields of each search group (see Entry.search_fields)."""
+
+
+class StringColumn:
+    """All values of one string field joined into a single string, each followed by a null character.
+    Appended values are collected and joined into the column on the next search.
+    """
+
+    def __init__(self) -> None:
+        self._text = ""
+        self._pending = []
+        self._offsets = array("I", [0])
+        self._derived = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def append(self, value:str) -> None:
+        """Appends the value of the next row.
+        """
+        value = value.replace(SEPARATOR, "")
+        self._pending.append(value)
+        self._offsets.append(self._offsets[-1] + len(value) + 1)
+
+    def flush(self) -> None:
+        """Joins the appended values into the column.
+        """
+        if self._pending:
+            self._pending.append("")
+            self._text += SEPARATOR.join(self._pending)
+            self._pending = []
+            self._derived = {}
+
+    def get(self, row:int) -> str:
+        """Returns the value of a row.
+        """
+        flushed = len(self) - len(self._pending)
+        if row >= flushed:
+            return self._pending[row - flushed]
+        return self._text[self._offsets[row]:self._offsets[row + 1] - 1]
+
+    def derived(self, kind:str) -> tuple:
+        """Returns the column converted for searching, "lower" for lower case and "digits" for phone numbers
+        reduced to their digits. Converted columns are cached until new values are appended.
+
+        Returns:
+            (str, array): the converted text and the offsets of its values
+        """
+        self.flush()
+        if kind not in self._derived:
+            if kind == "lower":
+                text = self._text.lower()
+                if text == self._text:
+                    self._derived[kind] = (self._text, self._offsets)
+                elif len(text) == len(self._text):
+                    self._derived[kind] = (text, self._offsets)
+                else:
+                    self._derived[kind] = self._convert(str.lower)
+            else:
+                self._derived[kind] = self._convert(normalize_phone)
+        return self._derived[kind]
+
+    def _convert(self, function) -> tuple:
+        values = [function(self.get(row)) for row in range(len(self))]
+        offsets = array("I", [0])
+        for value in values:
+            offsets.append(offsets[-1] + len(value) + 1)
+        values.append("")
+        return (SEPARATOR.join(values), offsets)
+
+    def find_rows(self, search_str:str, kind:str = "lower") -> set:
+        """Returns the rows whose converted value contains the search string.
+        """
+        if search_str == "":
+            return set(range(len(self)))
+        text, offsets = self.derived(kind)
+        rows = set()
+        position = text.find(search_str)
+        while position >= 0:
+            row = bisect_right(offsets, position) - 1
+            rows.add(row)
+            position = text.find(search_str, offsets[row + 1])
+        return rows
+
+
+class ColumnarStore:
+    """Column oriented store holding the data of all entries of a phonebook.
+    Changed entries get appended as new rows, the old rows are marked as deleted.
+    The store behaves like the sorted list of entries (see ContactList) but creates
+    the Entry objects on access.
+    """
+
+    def __init__(self) -> None:
+        self._clear()
+
+    def _clear(self) -> None:
+        self.columns = {field: StringColumn() for field in STRING_FIELDS}
+        self.sort_keys = StringColumn()
+        self.birthdays = array("i")
+        self.male = bytearray()
+        self.alive = bytearray()
+        self.rows = {}
+        self.registry = ColumnarRegistry(self)
+        self._order = array("I")
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def __iter__(self):
+        for row in array("I", self._order):
+            yield self.entry(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.entry(row) for row in self._order[index]]
+        return self.entry(self._order[index])
+
+    def __contains__(self, entry:Entry) -> bool:
+        return entry.file in self.rows
+
+    def append(self, entry:Entry) -> int:
+        """Appends an entry without sorting it in. Call sort() once all entries where appended.
+
+        Returns:
+            int: the row of the entry
+        """
+        old = self.rows.get(entry.file)
+        if old is not None:
+            self.alive[old] = 0
+        row = len(self.alive)
+        dictionary = entry.to_dict()
+        self.columns["file"].append(entry.file)
+        self.columns["notes"].append(json.dumps(dictionary["notes"]))
+        for field in STRING_FIELDS[2:]:
+            value = dictionary
+            for part in field.split("."):
+                value = value[part]
+            self.columns[field].append(str(value))
+        self.sort_keys.append(entry.sort_key())
+        self.birthdays.append(entry.personals.birthday.toordinal())
+        self.male.append(1 if entry.personals.male else 0)
+        self.alive.append(1)
+        self.rows[entry.file] = row
+        return row
+
+    def load(self, entries) -> None:
+        """Appends many entries at once and sorts them a single time.
+
+        Args:
+            entries (iterable): Entry objects. They can be dropped by the caller once they where appended.
+        """
+        for entry in entries:
+            self.append(entry)
+        self.sort()
+
+    def sort(self) -> None:
+        """Sorts all rows by the sort keys of their entries and joins all appended values into their columns.
+        """
+        for column in self.columns.values():
+            column.flush()
+        self.sort_keys.flush()
+        self._order = array("I", sorted(self.rows.values(), key = lambda row: (self.sort_keys.get(row), row)))
+
+    def add(self, entry:Entry) -> None:
+        """Appends an entry and inserts it at the position of its sort key.
+        """
+        if entry.file in self.rows:
+            self.remove(entry.file)
+        row = self.append(entry)
+        position = bisect_right(self._order, self.sort_keys.get(row), key = self.sort_keys.get)
+        self._order.insert(position, row)
+
+    def remove(self, file:str) -> None:
+        """Marks the row of an entry as deleted.
+        """
+        row = self.rows.pop(file, None)
+        if row is None:
+            return
+        self.alive[row] = 0
+        position = bisect_left(self._order, self.sort_keys.get(row), key = self.sort_keys.get)
+        while position < len(self._order) and self._order[position] != row:
+            position += 1
+        if position < len(self._order):
+            del self._order[position]
+        if len(self.alive) > 1000 and len(self.rows) * 2 < len(self.alive):
+            self.compact()
+    def update(self, entry:Entry) -> None:
+        """Stores the changed data of an entry.
+        """
+        self.add(entry)
+
+    def compact(self) -> None:
+        """Rebuilds all columns without the rows of deleted or outdated entries.
+        """
+        entries = [self.entry(row) for row in sorted(self.rows.values())]
+        self._clear()
+        self.load(entries)
+
+    def entry(self, row:int) -> Entry:
+        """Creates the Entry object of a row.
+        """
+        def value(field:str) -> str:
+            return self.columns[field].get(row)
+
+        new = Entry(value("file"))
+        new.personals = Personals(
+            *[value("personals." + field) for field in PERSONAL_FIELDS],
+            NO_BIRTHDAY if self.birthdays[row] == NO_BIRTHDAY_ORDINAL else date.fromordinal(self.birthdays[row]),
+            self.male[row] == 1
+        )
+        for kind in ("private", "work"):
+            contact = Contact(
+                *[value(kind + "." + field) for field in CONTACT_FIELDS],
+                Address(*[value(kind + ".address." + field) for field in ADDRESS_FIELDS])
+            )
+            setattr(new, kind, contact)
+        new.notes = json.loads(value("notes"))
+        return new
+
+    def _find_rows(self, search_str:str) -> set:
+        prefix, text = split_search(search_str)
+        rows = set()
+        if prefix == "#:":
+            digits = normalize_phone(text)
+            if digits != "" or text == "":
+                for field in GROUP_FIELDS["phone"]:
+                    rows |= self.columns[field].find_rows(digits, "digits")
+                return rows
+            groups = ("phone",)
+        elif prefix == "@:" and "@" in text:
+            for field in GROUP_FIELDS["email"]:
+                column = self.columns[field]
+                rows |= {row for row in range(len(column)) if email_matches(text, column.get(row).lower())}
+            return rows
+        else:
+            groups = SEARCH_SCOPES[prefix]
+        for group in groups:
+            for field in GROUP_FIELDS[group]:
+                rows |= self.columns[field].find_rows(text)
+        return rows
+
+    def search(self, search_str:str) -> list:
+        """Returns the entries matching the search string. The search runs over the columns
+        of the searched fields and only creates Entry objects for the rows that are accessed.
+
+        Args:
+            search_str (str): A string to search possible flags: "all:", "#all:", "org:", "add:", "#add:", "#:", "@:"
+
+        Returns:
+            ColumnarResult: Sorted list of entries
+        """
+        rows = [row for row in self._find_rows(search_str) if self.alive[row]]
+        rows.sort(key = lambda row: (self.sort_keys.get(row), row))
+        return ColumnarResult(self, rows)
+
+
+class ColumnarRegistry:
+    """Read only mapping of the file paths of a ColumnarStore to their entries.
+    Used by the Database in place of its registry dictionary.
+    """
+
+    def __init__(self, store:ColumnarStore) -> None:
+        self.store = store
+
+    def __len__(self) -> int:
+        return len(self.store.rows)
+
+    def __iter__(self):
+        return iter(list(self.store.rows))
+
+    def __contains__(self, file:str) -> bool:
+        return file in self.store.rows
+
+    def __getitem__(self, file:str) -> Entry:
+        return self.store.entry(self.store.rows[file])
+
+    def get(self, file:str, default = None) -> Entry:
+        """Returns the entry of a file or the default if the file is not part of the store.
+        """
+        if file not in self.store.rows:
+            return default
+        return self[file]
+
+
+class ColumnarResult:
+    """Sorted list of rows of a ColumnarStore creating the Entry objects on access.
+    """
+
+    def __init__(self, store:ColumnarStore, rows:list[int]) -> None:
+        self.store = store
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self.store.entry(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.store.entry(row) for row in self.rows[index]]
+        return self.store.entry(self.rows[index])
@@ -0,0 +1,196 @@
+"""Contains the sorted list holding all entries of a phonebook.
+"""
+
+from bisect import bisect_left, bisect_right
+from itertools import chain
+
+from entry import Entry
+
+
+BLOCK_SIZE = 1000
+
+
+class ContactList:
+    """List of entries kept sorted by their sort key.
+
+    The entries are stored in blocks of up to 2 * BLOCK_SIZE entries, so inserting or removing
+    an entry only needs a binary search and moves the entries of a single block.
+    """
+
+    def __init__(self, items = ()) -> None:
+        """Creates the list from (sort key, entry) pairs. The pairs do not have to be sorted.
+
+        Args:
+            items (iterable, optional): (sort key, entry) pairs. Defaults to ().
+        """
+        self._keys = {}
+        self._blocks = []
+        self._block_keys = []
+        self._maxes = []
+        self._offsets = None
+        self._rebuild(items)
+
+    def _rebuild(self, items) -> None:
+        items = sorted(items, key = lambda item: item[0])
+        self._keys = {entry: key for key, entry in items}
+        self._blocks = []
+        self._block_keys = []
+        for i in range(0, len(items), BLOCK_SIZE):
+            block = items[i:i + BLOCK_SIZE]
+            self._blocks.append([entry for _, entry in block])
+            self._block_keys.append([key for key, _ in block])
+        self._maxes = [keys[-1] for keys in self._block_keys]
+        self._offsets = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self):
+        return chain.from_iterable(list(self._blocks))
+
+    def __contains__(self, entry:Entry) -> bool:
+        return entry in self._keys
+
+    def _get_offsets(self) -> list[int]:
+        if self._offsets is None:
+            offsets = [0]
+            for block in self._blocks:
+                offsets.append(offsets[-1] + len(block))
+            self._offsets = offsets
+        return self._offsets
+
+    def _locate(self, index:int) -> tuple:
+        offsets = self._get_offsets()
+        block = bisect_right(offsets, index) - 1
+        return (block, index - offsets[block])
+
+    def __getitem__(self, index):
+        length = len(self)
+        if isinstance(index, slice):
+            start, stop, step = index.indices(length)
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            result = []
+            if start >= stop:
+                return result
+            block, position = self._locate(start)
+            while len(result) < stop - start and block < len(self._blocks):
+                result.extend(self._blocks[block][position:position + stop - start - len(result)])
+                block += 1
+                position = 0
+            return result
+        if index < 0:
+            index += length
+        if not 0 <= index < length:
+            raise IndexError("ContactList index out of range")
+        block, position = self._locate(index)
+        return self._blocks[block][position]
+
+    def index_of(self, entry:Entry) -> int:
+        """Returns the position of an entry. Sorting entries by their position keeps the order
+        of entries with equal sort keys the same as inside the list.
+
+        Raises:
+            ValueError: if the entry is not part of the list
+        """
+        if entry not in self._keys:
+            raise ValueError("Entry is not part of the ContactList")
+        key = self._keys[entry]
+        block = bisect_left(self._maxes, key)
+        while block < len(self._blocks):
+            keys = self._block_keys[block]
+            for position in range(bisect_left(keys, key), bisect_right(keys, key)):
+                if self._blocks[block][position] is entry:
+                    return self._get_offsets()[block] + position
+            block += 1
+        raise ValueError("Entry is not part of the ContactList")
+
+    def add(self, entry:Entry) -> None:
+        """Inserts an entry at the position of its sort key.
+        """
+        key = entry.sort_key()
+        self._keys[entry] = key
+        self._offsets = None
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._block_keys.append([key])
+            self._maxes.append(key)
+            return
+        block = bisect_right(self._maxes, key)
+        if block == len(self._blocks):
+            block -= 1
+        keys = self._block_keys[block]
+        position = bisect_right(keys, key)
+        keys.insert(position, key)
+        self._blocks[block].insert(position, entry)
+        self._maxes[block] = keys[-1]
+        if len(keys) > 2 * BLOCK_SIZE:
+            self._blocks[block + 1:block + 1] = [self._blocks[block][BLOCK_SIZE:]]
+            self._block_keys[block + 1:block + 1] = [keys[BLOCK_SIZE:]]
+            del self._blocks[block][BLOCK_SIZE:]
+            del keys[BLOCK_SIZE:]
+            self._maxes[block:block + 1] = [keys[-1], self._block_keys[block + 1][-1]]
+
+    def append(self, entry:Entry) -> None:
+        """Same as add. The entry will be inserted at the position of its sort key.
+        """
+        self.add(entry)
+
+    def extend(self, entries) -> None:
+        """Inserts multiple entries at once. Large batches get merged by rebuilding the blocks.
+        """
+        entries = list(entries)
+        if len(entries) < len(self) // 10:
+            for entry in entries:
+                self.add(entry)
+            return
+        items = [(key, entry) for entry, key in self._keys.items()]
+        items.extend((entry.sort_key(), entry) for entry in entries)
+        self._rebuild(items)
+
+    def remove(self, entry:Entry) -> None:
+        """Removes an entry.
+
+        Raises:
+            ValueError: if the entry is not part of the list
+        """
+        if entry not in self._keys:
+            raise ValueError("Entry is not part of the ContactList")
+        key = self._keys.pop(entry)
+        self._offsets = None
+        block = bisect_left(self._maxes, key)
+        while block < len(self._blocks):
+            keys = self._block_keys[block]
+            start = bisect_left(keys, key)
+            stop = bisect_right(keys, key)
+            for position in range(start, stop):
+                if self._blocks[block][position] is entry:
+                    del keys[position]
+                    del self._blocks[block][position]
+                    if keys:
+                        self._maxes[block] = keys[-1]
+                        self._merge(block)
+                    else:
+                        del self._blocks[block]
+                        del self._block_keys[block]
+                        del self._maxes[block]
+                    return
+            block += 1
+
+    def _merge(self, block:int) -> None:
+        """Merges a block that got to small into its successor.
+        """
+        if len(self._blocks[block]) >= BLOCK_SIZE // 2 or block + 1 >= len(self._blocks):
+            return
+        if len(self._blocks[block]) + len(self._blocks[block + 1]) > 2 * BLOCK_SIZE:
+            return
+        self._blocks[block].extend(self._blocks.pop(block + 1))
+        self._block_keys[block].extend(self._block_keys.pop(block + 1))
+        del self._maxes[block]
+
+    def reposition(self, entry:Entry) -> None:
+        """Moves an entry to its new position if its sort key changed.
+        """
+        if entry in self._keys and self._keys[entry] != entry.sort_key():
+            self.remove(entry)
+            self.add(entry)
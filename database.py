@@ -4,10 +4,20 @@
 import os
 import random as rnd
 import datetime
-from os.path import isfile, exists, join
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from os.path import exists, join
 
 import path_config
-from entry import Entry
+from entry import Entry, LazyEntry, GroupCommit, split_search, normalize_phone
+from pack_storage import PackStorage
+from sqlite_storage import SqliteStorage
+from startup_index import StartupIndex
+from contact_list import ContactList
+from columnar_store import ColumnarStore
+from search_index import TrigramIndex, PhoneIndex, EmailIndex
+from search_cursor import SearchCursor
+import snapshot
 from input_lib import input_bool, InputAbortException, InputExitException
 
 
@@ -15,41 +25,114 @@ class Database:
     """This class represents one database manager object used to manage your phonebook
     """
 
-    def __init__(self) -> None:
+    def __init__(self, workers:int = None, use_processes:bool = None, storage = None, use_index:bool = None,
+                 lazy:bool = None, columnar:bool = None) -> None:
+        """Loads all contacts from the phonebook folder.
+
+        Args:
+            workers (int, optional): Size of the pool used to read and decode the contact files.
+                                     A value of 1 or less loads all files serially. Defaults to path_config.LOAD_WORKERS.
+            use_processes (bool, optional): Set to True to use a process pool instead of a thread pool.
+                                            Defaults to path_config.LOAD_USE_PROCESSES.
+            storage (optional): Storage backend holding all entries (e.g. a PackStorage). If None the backend
+                                configured by path_config.STORAGE_BACKEND will be used.
+            use_index (bool, optional): Set to True to only parse the files that changed since the last start
+                                        using the startup index. Defaults to path_config.USE_STARTUP_INDEX.
+            lazy (bool, optional): Set to True to only keep a summary of each entry in memory and load
+                                   the full data on demand. Defaults to path_config.LAZY_ENTRIES.
+            columnar (bool, optional): Set to True to keep all entries inside a ColumnarStore instead of
+                                       one object tree per entry. Defaults to path_config.COLUMNAR_STORE.
+        """
+        if workers is None:
+            workers = path_config.LOAD_WORKERS
+        if use_processes is None:
+            use_processes = path_config.LOAD_USE_PROCESSES
+        if use_index is None:
+            use_index = path_config.USE_STARTUP_INDEX
+        if lazy is None:
+            lazy = path_config.LAZY_ENTRIES
+        if columnar is None:
+            columnar = path_config.COLUMNAR_STORE
+        if columnar:
+            lazy = False
         self.contacts = []
         self.folder = path_config.get_folder_path()
+        self.files = []
+        self.lazy = lazy
+        self.columns = ColumnarStore() if columnar else None
+        self.lock = threading.RLock()
+        index = None
         if not exists(self.folder):
             os.makedirs(self.folder)
-            self.files = []
             print("No folder found. New one was created!")
+        if storage is None and path_config.STORAGE_BACKEND == "pack":
+            storage = PackStorage(path_config.get_pack_path())
+        elif storage is None and path_config.STORAGE_BACKEND == "sqlite":
+            storage = SqliteStorage(path_config.get_sqlite_path())
+        self.storage = storage
+        Entry.storage = storage
+        stats = {}
+        cached = []
+        decorated = []
+
+        def keep(entry:Entry, sort_key:str = None) -> None:
+            if self.columns is not None:
+                self.columns.append(entry)
+            else:
+                decorated.append((sort_key if sort_key is not None else entry.sort_key(), entry))
+
+        if storage is not None:
+            for key, dictionary in storage.load_all():
+                entry = Entry.from_dict(dictionary, join(self.folder, key))
+                if lazy:
+                    entry = LazyEntry(entry.file, entry.summary())
+                cached.append(key)
+                keep(entry)
         else:
-            self.files = [
-                f for f in os.listdir(self.folder)
-                if (
-                    isfile(join(self.folder, f)) and
-                    (f.lower()[-len(path_config.FILE_EXTENSINON):] == path_config.FILE_EXTENSINON)
-                )
-            ]
-        print_status = len(self.files) > 200
-        count = 0
+            with os.scandir(self.folder) as dir_entries:
+                for dir_entry in dir_entries:
+                    if dir_entry.is_file() and dir_entry.name.lower().endswith(path_config.FILE_EXTENSINON):
+                        stat = dir_entry.stat()
+                        stats[dir_entry.name] = (stat.st_mtime_ns, stat.st_size)
+            self.files = list(stats.keys())
+            if use_index:
+                index = StartupIndex(path_config.get_index_path())
+                for file in self.files:
+                    record = index.lookup(file, stats[file])
+                    if record is not None:
+                        if lazy:
+                            entry = LazyEntry(join(self.folder, file), StartupIndex.summary(record))
+                        else:
+                            entry = Entry.from_dict(record["record"], join(self.folder, file))
+                        cached.append(file)
+                        keep(entry, record["sort_key"])
+        cached_files = set(cached)
+        paths = [join(self.folder, file) for file in self.files if file not in cached_files]
+        total = len(cached) + len(paths)
+        print_status = total > 200
         failed = 0
         max_out_len = 0
-        for file in self.files:
-            entry, success = Entry.load(join(self.folder, file))
+        count = len(cached)
+        for entry, success in Database.load_entries(paths, workers, use_processes):
             if success:
-                self.contacts.append(entry)
+                if index is not None:
+                    name = os.path.basename(entry.file)
+                    index.update(name, stats[name], entry)
+                if lazy:
+                    entry = LazyEntry(entry.file, entry.summary())
+                keep(entry)
             else:
                 failed += 1
             count += 1
             if print_status:
                 out = "Loading ▐"
-                proz = count / len(self.files)
+                proz = count / total
                 len1 = int(proz * 20)
                 len2 = 20 - len1
                 out += "█" * len1
                 out += "░" * len2
                 out += "▌"
-                out += f" {count} / {len(self.files)} entries"
+                out += f" {count} / {total} entries"
                 if failed > 0:
                     out += f" ({failed} failed)"
                 if len(out) > max_out_len:
@@ -57,10 +140,56 @@ class Database:
                 print(out, end="\r")
         if print_status:
             print(" " * max_out_len, end="\r")
+        if index is not None:
+            index.retain(self.files)
+            index.save()
         print("Sorting ...", end="\r")
-        self.contacts.sort(key = lambda e: e.display()[0].lower())
+        if self.columns is not None:
+            # The columns are searched directly, the other indexes are created per request (see _phone_index).
+            self.columns.sort()
+            self.contacts = self.columns
+            self.search_index = None
+            self.phone_index = None
+            self.email_index = None
+            self.indexes = []
+            self.registry = self.columns.registry
+        else:
+            self.contacts = ContactList(decorated)
+            self.search_index = TrigramIndex(self.contacts)
+            self.phone_index = PhoneIndex(self.contacts)
+            self.email_index = EmailIndex(self.contacts)
+            self.indexes = [self.search_index, self.phone_index, self.email_index]
+            self.registry = {entry.file: entry for entry in self.contacts}
+        self.file_stats = stats
+        self.folder_mtime = os.stat(self.folder).st_mtime_ns
         print(f"Loaded {len(self.contacts)} Contacts.  {datetime.datetime.now()}")
 
+    @staticmethod
+    def load_entries(paths:list[str], workers:int = 1, use_processes:bool = False):
+        """Loads the entries of the given files using a thread or process pool.
+        The results are yielded in the same order as the given paths.
+
+        Args:
+            paths (list[str]): Full paths of the files to load.
+            workers (int, optional): Size of the pool. A value of 1 or less loads all files serially. Defaults to 1.
+            use_processes (bool, optional): Set to True to use a process pool instead of a thread pool. Defaults to False.
+
+        Yields:
+            tuple: The result of Entry.load for each path
+        """
+        if workers <= 1 or len(paths) <= 1:
+            for path in paths:
+                yield Entry.load(path)
+            return
+        workers = min(workers, len(paths))
+        if use_processes:
+            chunksize = max(1, len(paths) // (workers * 16))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                yield from executor.map(Entry.load, paths, chunksize=chunksize)
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                yield from executor.map(Entry.load, paths)
+
     def search(self, search_str:str) -> list:
         """Returns a list of entries matching the search string.
 
@@ -70,9 +199,65 @@ class Database:
         Returns:
             list: Sorted list of entries
         """
-        result = [entry for entry in self.contacts if entry.match(search_str)]
+        if self.columns is not None:
+            with self.lock:
+                return self.columns.search(search_str)
+        with self.lock:
+            candidates = self._candidates(search_str)
+            if candidates is None:
+                result = [entry for entry in self.contacts if entry.match(search_str)]
+            else:
+                result = [entry for entry in candidates if entry.match(search_str)]
+                result.sort(key = self.contacts.index_of)
         return result
 
+    def _candidates(self, search_str:str) -> set:
+        """Returns the entries that might match a search string using the indexes or None if all entries have to be checked.
+        """
+        storage_search = getattr(self.storage, "search", None)
+        if storage_search is not None:
+            # The storage backend has its own index (e.g. the full text index of a SqliteStorage).
+            keys = storage_search(search_str)
+            if keys is None:
+                return None
+            files = (join(self.folder, key) for key in keys)
+            return {self.registry[file] for file in files if file in self.registry}
+        prefix, text = split_search(search_str)
+        if prefix == "#:":
+            if normalize_phone(text) != "":
+                return self.phone_index.containing(text)
+            # Without digits the raw numbers get searched (see Entry.match), which are not indexed.
+            return None
+        if prefix == "@:" and "@" in text:
+            # Addresses containing the search text match as well (see entry.email_matches).
+            substrings = self.search_index.candidates(search_str)
+            if substrings is None:
+                return None
+            return self.email_index.search(text) | substrings
+        return self.search_index.candidates(search_str)
+
+    def search_lazy(self, search_str:str) -> SearchCursor:
+        """Same as search but returns the result as a SearchCursor, which is filled by a background thread.
+        The first rows of the result are available before all entries where checked.
+
+        Args:
+            search_str (str): A string to search possible flags: "all:", "#all:", "org:", "add:", "#add:", "#:", "@:"
+
+        Returns:
+            SearchCursor: Sorted result of the search
+        """
+        if self.columns is not None:
+            return SearchCursor(self.search(search_str))
+        with self.lock:
+            candidates = self._candidates(search_str)
+            if candidates is not None and len(candidates) * 4 < len(self.contacts):
+                source = sorted(candidates, key = self.contacts.index_of)
+                return SearchCursor(source, lambda entry: entry.match(search_str))
+            source = list(self.contacts)
+        if candidates is None:
+            return SearchCursor(source, lambda entry: entry.match(search_str))
+        return SearchCursor(source, lambda entry: entry in candidates and entry.match(search_str))
+
     def add_new_entry(self, first_name:str="", last_name:str="") -> Entry:
         """Adds a new entry to the database.
 
@@ -96,23 +281,228 @@ class Database:
                 pass
             if not new.is_empty():
                 new.save()
-                self.contacts.append(new)
+                self.insert_entry(new)
                 print("New entry added.")
                 return new
         except InputAbortException:
             print("!Action Aborted!\nNo new entry was added.")
             return None
 
+    def _record_stat(self, entry:Entry) -> None:
+        if self.storage is not None:
+            return
+        try:
+            stat = os.stat(entry.file)
+            self.file_stats[os.path.basename(entry.file)] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            self.file_stats.pop(os.path.basename(entry.file), None)
+
+    def insert_entry(self, entry:Entry) -> None:
+        """Adds an already saved entry to the contacts list and all search structures.
+        An entry already registered for the same file gets replaced.
+
+        Args:
+            entry (Entry): the new entry
+        """
+        with self.lock:
+            if self.columns is not None:
+                self.columns.add(entry)
+                self._record_stat(entry)
+                return
+            old = self.registry.get(entry.file)
+            if old is not None:
+                # A sync may already have loaded the file between saving and inserting the entry.
+                self._remove_entry(old)
+            self.registry[entry.file] = entry
+            self.contacts.add(entry)
+            for index in self.indexes:
+                index.add(entry)
+            self._record_stat(entry)
+
+    def insert_entries(self, entries:list[Entry]) -> None:
+        """Adds multiple already saved entries at once. The contacts list gets merged
+        and every index updated a single time instead of once per entry.
+        Entries already registered for the same files get replaced.
+
+        Args:
+            entries (list[Entry]): the new entries
+        """
+        if self.lazy:
+            entries = [LazyEntry(entry.file, entry.summary()) for entry in entries]
+        with self.lock:
+            if self.columns is not None:
+                for entry in entries:
+                    self.columns.append(entry)
+                self.columns.sort()
+            else:
+                for entry in entries:
+                    old = self.registry.get(entry.file)
+                    if old is not None:
+                        self._remove_entry(old)
+                    self.registry[entry.file] = entry
+                self.contacts.extend(entries)
+                for index in self.indexes:
+                    index.add_many(entries)
+            for entry in entries:
+                self._record_stat(entry)
+
+    def _remove_entry(self, entry:Entry) -> None:
+        with self.lock:
+            if self.columns is not None:
+                self.columns.remove(entry.file)
+                self.file_stats.pop(os.path.basename(entry.file), None)
+                return
+            if self.registry.pop(entry.file, None) is None:
+                return
+            self.contacts.remove(entry)
+            for index in self.indexes:
+                index.remove(entry)
+            self.file_stats.pop(os.path.basename(entry.file), None)
+
+    def delete_entry(self, entry:Entry) -> None:
+        """Deletes the file of an entry and removes the entry from the contacts list.
+
+        Args:
+            entry (Entry): the entry to delete
+        """
+        entry.delete_file()
+        self._remove_entry(entry)
+
+    def reconcile(self) -> int:
+        """Removes all entries from the contacts list that where deleted in the file system
+        (or inside the storage backend) using a single pass over the phonebook folder.
+
+        Returns:
+            int: count of removed entries
+        """
+        if self.storage is not None:
+            present = set(self.storage.keys())
+        else:
+            with os.scandir(self.folder) as dir_entries:
+                present = {dir_entry.name for dir_entry in dir_entries}
+        with self.lock:
+            killables = [self.registry[file] for file in list(self.registry) if os.path.basename(file) not in present]
+            for entry in killables:
+                self._remove_entry(entry)
+        return len(killables)
+
     def update_deleted_entries(self) -> None:
         """Removes all entries from the contacts list that where deleted in the file system.
         """
-        killables = []
-        for entry in self.contacts:
-            if not isfile(entry.file):
-                killables.append(entry)
-        for entry in killables:
-            if entry in self.contacts:
-                self.contacts.remove(entry)
+        self.reconcile()
+
+    def sync(self, full_scan:bool = True) -> tuple:
+        """Applies changes other programs made inside the phonebook folder.
+        New files get loaded, changed files reloaded and entries of removed files dropped.
+
+        Args:
+            full_scan (bool, optional): Set to False to skip the scan if the modification time of the folder
+                                        did not change. (Changes written in place might be missed.) Defaults to True.
+
+        Returns:
+            (int, int, int): count of added, changed and removed entries
+        """
+        if self.storage is not None:
+            return (0, 0, 0)
+        folder_mtime = os.stat(self.folder).st_mtime_ns
+        if not full_scan and folder_mtime == self.folder_mtime:
+            return (0, 0, 0)
+        self.folder_mtime = folder_mtime
+        stats = {}
+        with os.scandir(self.folder) as dir_entries:
+            for dir_entry in dir_entries:
+                if dir_entry.is_file() and dir_entry.name.lower().endswith(path_config.FILE_EXTENSINON):
+                    try:
+                        stat = dir_entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    stats[dir_entry.name] = (stat.st_mtime_ns, stat.st_size)
+        added = 0
+        changed = 0
+        with self.lock:
+            removed = [self.registry[file] for file in list(self.registry) if os.path.basename(file) not in stats]
+            for entry in removed:
+                self._remove_entry(entry)
+            for name, stat in stats.items():
+                if self.file_stats.get(name) == stat:
+                    continue
+                path = join(self.folder, name)
+                entry = self.registry.get(path)
+                try:
+                    if entry is None:
+                        entry, success = Entry.load(path)
+                        if not success:
+                            continue
+                        if self.lazy:
+                            entry = LazyEntry(entry.file, entry.summary())
+                        self.insert_entry(entry)
+                        added += 1
+                    else:
+                        entry.reload()
+                        self.update_entry(entry)
+                        changed += 1
+                except ValueError:
+                    # The file is still being written, it will be read again by the next sync.
+                    continue
+                self.file_stats[name] = stat
+        return (added, changed, len(removed))
+
+    def update_entry(self, entry:Entry) -> None:
+        """Updates the search structures after an entry was changed and saved.
+
+        Args:
+            entry (Entry): the changed entry
+        """
+        with self.lock:
+            if self.columns is not None:
+                self.columns.update(entry)
+                self._record_stat(entry)
+                return
+            self.contacts.reposition(entry)
+            for index in self.indexes:
+                index.update(entry)
+            self._record_stat(entry)
+
+    def publish_snapshot(self, path:str = None) -> int:
+        """Publishes the current contacts as read only snapshot for other processes (see snapshot.Snapshot).
+
+        Args:
+            path (str, optional): the snapshot file. Defaults to path_config.get_snapshot_path().
+
+        Returns:
+            int: the generation of the new snapshot or -1 if it could not be published
+        """
+        with self.lock:
+            return snapshot.publish(self.contacts, path)
+
+    def email_domain_counts(self) -> dict:
+        """Returns the count of entries per e-mail domain.
+
+        Returns:
+            dict: entry count for each domain
+        """
+        return self._email_index().domain_counts()
+
+    def lookup_caller(self, number:str) -> list:
+        """Returns the entries belonging to the number of an incoming call.
+
+        Args:
+            number (str): the calling number in any format
+
+        Returns:
+            list: Sorted list of entries
+        """
+        return sorted(self._phone_index().lookup_caller(number), key = lambda e: e.sort_key())
+
+    def _phone_index(self) -> PhoneIndex:
+        if self.phone_index is None:
+            return PhoneIndex(self.contacts)
+        return self.phone_index
+
+    def _email_index(self) -> EmailIndex:
+        if self.email_index is None:
+            return EmailIndex(self.contacts)
+        return self.email_index
 
     def generate_random_entries(self):
         """Generates random Entries based on a random-names.txt file.
@@ -122,7 +512,7 @@ class Database:
         Genders will also be randomized.
         """
         try:
-            with open("random-names.txt", "r", encoding="utf-8") as names_file:
+            with open("random-names.txt", "r", encoding="utf-8") as names_file, GroupCommit():
                 while True:
                     line:str = names_file.readline().replace("\n", "").replace("\r", "").strip()
                     if line == "":
@@ -137,6 +527,6 @@ class Database:
                     new.private.phone = "0" + str(rnd.randrange(1000000000, 1999999999))
                     new.private.email = (names[0][0] + "." + names[1] + str(rnd.randrange(10, 9999)) + "@example.com").lower()
                     new.save()
-                    self.contacts.append(new)
+                    self.insert_entry(new)
         except (PermissionError, FileExistsError) as ex:
             print(ex)
@@ -3,24 +3,199 @@
    Classes:
     - Contact
     - Address
+    - Entry
+    - LazyEntry
+    - GroupCommit
 """
 import json
 import os
+import sys
+import uuid
+import threading
+from collections import OrderedDict
 from datetime import date
-from os.path import exists, isfile
+from os.path import exists, isfile, dirname
 import path_config
 from input_lib import input_rex, input_date, input_bool, input_multiline, PHONE_NR_PATTERN, EMAIL_PATTERN, InputExitException, HelpOutput
 
 
+NO_BIRTHDAY = date(1800,1,1)
+"""Shared date used by all entries without a birthday."""
+
+SEARCH_SCOPES = {
+    "": ("name",),
+    "all:": ("organisation", "address", "email"),
+    "#all:": ("organisation", "address", "email", "address_numbers", "phone"),
+    "org:": ("organisation",),
+    "add:": ("address",),
+    "#add:": ("address", "address_numbers"),
+    "@:": ("email",),
+    "#:": ("phone_digits",)
+}
+"""The groups of fields searched for each search prefix."""
+
+
+FIELD_PATHS = (
+    "personals.first_name", "personals.last_name", "personals.title", "personals.nickname",
+    "personals.organisation", "personals.birthday", "personals.male",
+    "private.phone", "private.mobile", "private.fax", "private.email",
+    "private.address.street", "private.address.number", "private.address.zip_code",
+    "private.address.city", "private.address.state", "private.address.country",
+    "work.phone", "work.mobile", "work.fax", "work.email",
+    "work.address.street", "work.address.number", "work.address.zip_code",
+    "work.address.city", "work.address.state", "work.address.country",
+    "notes"
+)
+"""Dotted paths of all fields of an entry (see Entry.get_field and Entry.set_field)."""
+
+
+def normalize_phone(number:str) -> str:
+    """Returns only the digits of a phone number.
+    """
+    return "".join(char for char in str(number) if char.isdigit())
+
+
+def email_matches(search_str:str, email:str) -> bool:
+    """Checks if an e-mail address matches a search containing an "@".
+    "name@" matches the local part, "@example.com" matches the domain and all of its
+    subdomains and "name@example.com" matches both. Addresses containing the search text
+    match as well, so partial searches like "hn@acme" or "@example" keep working.
+
+    Args:
+        search_str (str): lowercase search text containing an "@"
+        email (str): the e-mail address to check
+
+    Returns:
+        bool: True if the address matches
+    """
+    email = email.lower()
+    if search_str in email:
+        return True
+    local, at_sign, domain = email.rpartition("@")
+    if at_sign == "":
+        return False
+    search_local, _, search_domain = search_str.rpartition("@")
+    if search_local != "" and local != search_local:
+        return False
+    return search_domain == "" or domain == search_domain or domain.endswith("." + search_domain)
+
+
+def split_search(search_str:str) -> tuple:
+    """Splits a search string into its prefix and the lowercase text to search for.
+
+    Args:
+        search_str (str): A string to search possible flags: "all:", "#all:", "org:", "add:", "#add:", "#:", "@:"
+
+    Returns:
+        (str, str): the prefix (empty if no prefix was used) and the lowercase search text
+    """
+    search_str = search_str.lower()
+    prefix = search_str[:search_str.find(":") + 1]
+    if prefix != "" and prefix in SEARCH_SCOPES:
+        return (prefix, search_str[len(prefix):])
+    return ("", search_str)
+
+
+class GroupCommit:
+    """Batches the fsync calls of the folders of all files written inside a with statement.
+
+    Outside of a group every write_file_atomic call syncs its file and its folder. Inside a group
+    the data of each file is still synced before it gets renamed into place, so a crash never
+    leaves an empty or truncated entry behind, but every folder only gets synced once when the
+    outermost group ends. A group only covers the files written by its own thread and process,
+    writes of other threads are synced as usual.
+    Use it for bulk operations like imports or generating phonebooks.
+    """
+
+    _local = threading.local()
+
+    def __init__(self) -> None:
+        self.folders = set()
+        self._outer = None
+        self._pid = os.getpid()
+
+    def __enter__(self):
+        self._outer = GroupCommit.active()
+        GroupCommit._local.group = self
+        return self
+
+    def __exit__(self, *args):
+        GroupCommit._local.group = self._outer
+        if self._outer is not None:
+            self._outer.folders.update(self.folders)
+        else:
+            self.commit()
+
+    @staticmethod
+    def active():
+        """Returns the running group of the current thread or None.
+        """
+        group = getattr(GroupCommit._local, "group", None)
+        if group is not None and group._pid != os.getpid():
+            # A forked worker process inherits the group of its parent but has to sync its own writes.
+            return None
+        return group
+
+    def add(self, path:str) -> None:
+        """Registers a written file whose folder has to be synced by the group.
+        """
+        self.folders.add(dirname(path))
+
+    def commit(self) -> None:
+        """Syncs the folders of all registered files.
+        """
+        for folder in self.folders:
+            fsync_folder(folder)
+        self.folders = set()
+
+
+def fsync_folder(path:str) -> None:
+    """Flushes the directory entries of a folder to the disk (not supported on Windows).
+    """
+    if os.name == "nt":
+        return
+    try:
+        descriptor = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def write_file_atomic(path:str, text:str) -> None:
+    """Writes a file by writing a temporary file next to it and renaming it over the old one.
+    Thereby a crash never leaves a partially written file behind.
+
+    Args:
+        path (str): the file to write.
+        text (str): the new content.
+    """
+    group = GroupCommit.active()
+    temp_path = path + "." + uuid.uuid4().hex + ".tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if exists(temp_path):
+            os.remove(temp_path)
+        raise
+    if group is None:
+        fsync_folder(dirname(path))
+    else:
+        group.add(path)
+
+
 class Address():
     """Holds a comon address
     """
-    street:str = ""
-    number:str = ""
-    zip_code:str = ""
-    city:str = ""
-    state:str = ""
-    country:str = ""
+    __slots__ = ("street", "number", "zip_code", "city", "state", "country")
 
     def __init__(
         self,
@@ -84,9 +259,9 @@ class Address():
         addr.street = dictionary["street"]
         addr.number = dictionary["number"]
         addr.zip_code = dictionary["zip_code"]
-        addr.city = dictionary["city"]
-        addr.state = dictionary["state"]
-        addr.country = dictionary["country"]
+        addr.city = sys.intern(dictionary["city"])
+        addr.state = sys.intern(dictionary["state"])
+        addr.country = sys.intern(dictionary["country"])
 
         return addr
 
@@ -95,13 +270,7 @@ class Personals():
     """Holds all personal informations
     """
 
-    first_name:str = ""
-    last_name:str = ""
-    title:str = ""
-    nickname:str = ""
-    organisation:str = ""
-    birthday:date = date(1800,1,1)
-    male:bool = True
+    __slots__ = ("first_name", "last_name", "title", "nickname", "organisation", "birthday", "male")
 
     def __init__(
         self,
@@ -166,8 +335,11 @@ class Personals():
         pers.last_name = dictionary["last_name"]
         pers.title = dictionary["title"]
         pers.nickname = dictionary["nickname"]
-        pers.organisation = dictionary["organisation"]
-        pers.birthday = date(dictionary["birthday"][0], dictionary["birthday"][1], dictionary["birthday"][2])
+        pers.organisation = sys.intern(dictionary["organisation"])
+        if dictionary["birthday"] == [1800, 1, 1]:
+            pers.birthday = NO_BIRTHDAY
+        else:
+            pers.birthday = date(dictionary["birthday"][0], dictionary["birthday"][1], dictionary["birthday"][2])
         pers.male = bool(dictionary["male"])
 
         return pers
@@ -177,11 +349,7 @@ class Contact():
     """Hold contact informations
     """
 
-    phone:str = ""
-    mobile:str = ""
-    fax:str = ""
-    email:str = ""
-    address:Address = None
+    __slots__ = ("phone", "mobile", "fax", "email", "address")
 
     def __init__(
         self,
@@ -243,12 +411,98 @@ class Entry:
     """Representing one entry inside of a phonebook holding its informations.
     """
 
-    def __init__(self) -> None:
-        self.file = path_config.new_file_name()
+    __slots__ = ("file", "personals", "private", "work", "notes", "_projections")
+
+    storage = None
+    """Optional storage backend holding all entries (e.g. a PackStorage).
+    If None every entry is stored in its own file."""
+
+    def __init__(self, file:str = None) -> None:
+        self.file = file if file is not None else path_config.new_file_name()
         self.personals = Personals()
         self.private = Contact(address=Address())
         self.work = Contact(address=Address())
         self.notes = []
+        self._projections = {}
+
+    def to_dict(self) -> dict:
+        """Returns the object as an dictionary
+        """
+        return {
+            "personals": self.personals.to_dict(),
+            "private": self.private.to_dict(),
+            "work": self.work.to_dict(),
+            "notes": self.notes
+        }
+
+    def read_dict(self, dictionary) -> None:
+        """Reads data from a dict into the object
+        """
+        self.personals = Personals.from_dict(dictionary["personals"])
+        self.private = Contact.from_dict(dictionary["private"])
+        self.work = Contact.from_dict(dictionary["work"])
+        self.notes = dictionary["notes"]
+        self.invalidate_search_cache()
+
+    @staticmethod
+    def from_dict(dictionary, file:str = None) -> any:
+        """Creates a new Entry from a dict
+
+        Args:
+            dictionary (dict): the entry data as returned by to_dict.
+            file (str, optional): The path of the entry. Defaults to a new file name.
+        """
+        entry = Entry(file)
+        entry.read_dict(dictionary)
+        return entry
+
+    def get_field(self, path:str):
+        """Returns the value of a field.
+
+        Args:
+            path (str): dotted path of the field (see FIELD_PATHS), e.g. "private.address.city"
+        """
+        value = self
+        for name in path.split("."):
+            value = getattr(value, name)
+        return value
+
+    def set_field(self, path:str, value) -> None:
+        """Sets the value of a field.
+
+        Args:
+            path (str): dotted path of the field (see FIELD_PATHS), e.g. "private.address.city"
+            value (any): the new value
+        """
+        names = path.split(".")
+        target = self
+        for name in names[:-1]:
+            target = getattr(target, name)
+        setattr(target, names[-1], value)
+        self.invalidate_search_cache()
+
+    @staticmethod
+    def storage_key(file:str) -> str:
+        """Returns the key used to store the entry of the given file inside the storage backend.
+        """
+        return os.path.basename(file)
+
+    @staticmethod
+    def read_file(file:str) -> dict:
+        """Reads the raw entry data of a file.
+
+        Args:
+            file (str): Path the the file containing the entry data.
+
+        Returns:
+            dict: the entry data or None if the file does not exist
+        """
+        if Entry.storage is not None:
+            return Entry.storage.get(Entry.storage_key(file))
+        if not exists(file):
+            return None
+        with open(file, "r", encoding="utf-8") as iofile:
+            return json.load(iofile)
 
     @staticmethod
     def load(file:str) -> tuple:
@@ -261,54 +515,53 @@ class Entry:
             tuple: The Entry object, A bool value returning True on a successfull load
         """
         try:
-            if exists(file):
-                with open(file, "r", encoding="utf-8") as iofile:
-                    dictionary = json.load(iofile)
-                    entry = Entry()
-                    entry.file = file
-                    entry.personals = Personals.from_dict(dictionary["personals"])
-                    entry.private = Contact.from_dict(dictionary["private"])
-                    entry.work = Contact.from_dict(dictionary["work"])
-                    entry.notes = dictionary["notes"]
-                return (entry, True)
+            dictionary = Entry.read_file(file)
+            if dictionary is not None:
+                return (Entry.from_dict(dictionary, file), True)
             return (FileNotFoundError(file), False)
         except PermissionError as ex:
             print("Entry.load")
             print(ex)
             return (ex, False)
+        except ValueError as ex:
+            # The file is corrupt or still being written by another program.
+            return (ex, False)
 
     def reload(self) -> None:
         """Reloads the entry data from its file.
         """
         try:
-            if exists(self.file):
-                with open(self.file, "r", encoding="utf-8") as iofile:
-                    dictionary = json.load(iofile)
-                    self.personals = Personals.from_dict(dictionary["personals"])
-                    self.private = Contact.from_dict(dictionary["private"])
-                    self.work = Contact.from_dict(dictionary["work"])
-                    self.notes = dictionary["notes"]
+            dictionary = Entry.read_file(self.file)
+            if dictionary is not None:
+                self.read_dict(dictionary)
         except PermissionError as ex:
             print("Entry.reload")
             print(ex)
 
+    def exists(self) -> bool:
+        """Checks if the entry is still stored in the file system or storage backend.
+        """
+        if Entry.storage is not None:
+            return Entry.storage.exists(Entry.storage_key(self.file))
+        return isfile(self.file)
+
     def delete_file(self):
         """Deletes the entry file inside the file system.
         """
-        if isfile(self.file):
+        if Entry.storage is not None:
+            Entry.storage.delete(Entry.storage_key(self.file))
+        elif isfile(self.file):
             os.remove(self.file)
 
     def save(self) -> bool:
         """Saves the Entry object to the file.
         """
+        self.invalidate_search_cache()
         try:
-            with open(self.file, "w+", encoding="utf-8") as file:
-                json.dump({
-                    "personals": self.personals.to_dict(),
-                    "private": self.private.to_dict(),
-                    "work": self.work.to_dict(),
-                    "notes": self.notes
-                }, file)
+            if Entry.storage is not None:
+                Entry.storage.put(Entry.storage_key(self.file), self.to_dict())
+                return True
+            write_file_atomic(self.file, json.dumps(self.to_dict()))
             return True
         except PermissionError as ex:
             print("Entry.save")
@@ -391,6 +644,8 @@ class Entry:
                                                     EMAIL_PATTERN, self.private.email, show_default=(self.private.email.strip() != "")).strip()
         except InputExitException:
             pass
+        finally:
+            self.invalidate_search_cache()
 
     def edit_note(self) -> None:
         """Edits the Contacts Note.
@@ -477,6 +732,8 @@ class Entry:
                                                     show_default=(self.work.address.country.strip() != "")).strip()
         except InputExitException:
             pass
+        finally:
+            self.invalidate_search_cache()
 
     def display(self) -> str:
         """Returns a displayable name
@@ -534,6 +791,43 @@ class Entry:
             result = self.work.fax.strip()
         return (result, icon)
 
+    def sort_key(self) -> str:
+        """Returns the key used to sort the entries of a phonebook.
+        """
+        return self.display()[0].lower()
+
+    def summary(self) -> dict:
+        """Returns the few fields needed to list and sort the entry without its full data.
+
+        Returns:
+            dict: display name and icon, sort key, primary contact and icon and the searchable names
+        """
+        display, icon = self.display()
+        contact, contact_icon = self.get_contact()
+        return {
+            "display": display,
+            "icon": icon,
+            "sort_key": display.lower(),
+            "contact": contact,
+            "contact_icon": contact_icon,
+            "first_name": self.personals.first_name,
+            "last_name": self.personals.last_name,
+            "nickname": self.personals.nickname
+        }
+
+    def list_row(self) -> tuple:
+        """Returns the values shown for the entry inside the list view.
+        They are cached together with the search projections until the entry gets edited, reloaded or saved.
+
+        Returns:
+            (str, str, str, str): display name and icon, primary contact and icon
+        """
+        row = self._projections.get("row")
+        if row is None:
+            row = self.display() + self.get_contact()
+            self._projections["row"] = row
+        return row
+
     def is_empty(self):
         """Checks if the entry has at least one filled attribute.
            (Gender attribute is ignored!)
@@ -573,84 +867,239 @@ class Entry:
             return False
         return True
 
+    def search_fields(self, group:str) -> list[str]:
+        """Returns the lowercase values of a group of fields used by the search.
+
+        Args:
+            group (str): One of "name", "organisation", "address", "address_numbers", "email", "phone" and "phone_digits"
+
+        Returns:
+            list[str]: lowercase field values
+        """
+        if group == "name":
+            return [
+                self.personals.first_name.lower(),
+                self.personals.last_name.lower(),
+                self.personals.nickname.lower()
+            ]
+        if group == "organisation":
+            return [self.personals.organisation.lower()]
+        if group == "address":
+            return [
+                self.private.address.city.lower(),
+                self.private.address.country.lower(),
+                self.private.address.state.lower(),
+                self.private.address.street.lower(),
+                self.work.address.city.lower(),
+                self.work.address.country.lower(),
+                self.work.address.state.lower(),
+                self.work.address.street.lower()
+            ]
+        if group == "address_numbers":
+            return [
+                str(self.private.address.number).lower(),
+                str(self.private.address.zip_code).lower(),
+                str(self.work.address.number).lower(),
+                str(self.work.address.zip_code).lower()
+            ]
+        if group == "email":
+            return [self.private.email.lower(), self.work.email.lower()]
+        if group == "phone":
+            return [
+                str(self.private.phone).lower(),
+                str(self.private.mobile).lower(),
+                str(self.private.fax).lower(),
+                str(self.work.phone).lower(),
+                str(self.work.mobile).lower(),
+                str(self.work.fax).lower()
+            ]
+        if group == "phone_digits":
+            return [normalize_phone(number) for number in self.search_fields("phone")]
+        raise ValueError(f"Unknown search group: {group}")
+
+    def invalidate_search_cache(self) -> None:
+        """Drops the cached search projections. Has to be called after the entry data was changed.
+        """
+        self._projections = {}
+
+    def search_projection(self, prefix:str) -> str:
+        """Returns all lowercase values searched for a search prefix joined by new lines.
+        The projection is cached until the entry gets edited, reloaded or saved.
+
+        Args:
+            prefix (str): One of the search prefixes or an empty string for the name search.
+
+        Returns:
+            str: the joined lowercase values
+        """
+        projection = self._projections.get(prefix)
+        if projection is None:
+            parts = []
+            for group in SEARCH_SCOPES[prefix]:
+                parts.extend(self.search_fields(group))
+            projection = "\n".join(parts)
+            self._projections[prefix] = projection
+        return projection
+
     def match(self, search_str:str) -> bool:
         """Checks if the entry matches the search
         """
-        search_str = search_str.lower()
-        parts = []
-
-        if search_str.startswith("all:") or search_str.startswith("#all:"):
-            parts.append(self.personals.organisation.lower())
-            parts.append(self.private.address.city.lower())
-            parts.append(self.private.address.country.lower())
-            parts.append(self.private.address.state.lower())
-            parts.append(self.private.address.street.lower())
-            parts.append(self.work.address.city.lower())
-            parts.append(self.work.address.country.lower())
-            parts.append(self.work.address.state.lower())
-            parts.append(self.work.address.street.lower())
-            parts.append(self.private.email.lower())
-            parts.append(self.work.email.lower())
-
-            if search_str.startswith("#all:"):
-                parts.append(str(self.private.address.number).lower())
-                parts.append(str(self.private.address.zip_code).lower())
-                parts.append(str(self.work.address.number).lower())
-                parts.append(str(self.work.address.zip_code).lower())
-                parts.append(str(self.private.phone).lower())
-                parts.append(str(self.private.mobile).lower())
-                parts.append(str(self.private.fax).lower())
-                parts.append(str(self.work.phone).lower())
-                parts.append(str(self.work.mobile).lower())
-                parts.append(str(self.work.fax).lower())
-                search_str = search_str[5:]
-            else:
-                search_str = search_str[4:]
-
-        elif search_str.startswith("org:"):
-            parts.append(self.personals.organisation.lower())
-            search_str = search_str[4:]
-
-        elif search_str.startswith("add:") or search_str.startswith("#add:"):
-            parts.append(self.private.address.city.lower())
-            parts.append(self.private.address.country.lower())
-            parts.append(self.private.address.state.lower())
-            parts.append(self.private.address.street.lower())
-            parts.append(self.work.address.city.lower())
-            parts.append(self.work.address.country.lower())
-            parts.append(self.work.address.state.lower())
-            parts.append(self.work.address.street.lower())
-
-            if search_str.startswith("#add:"):
-                parts.append(str(self.private.address.number).lower())
-                parts.append(str(self.private.address.zip_code).lower())
-                parts.append(str(self.work.address.number).lower())
-                parts.append(str(self.work.address.zip_code).lower())
-                search_str = search_str[5:]
+        prefix, search_str = split_search(search_str)
+        if prefix == "#:":
+            digits = normalize_phone(search_str)
+            if digits != "" or search_str == "":
+                search_str = digits
             else:
-                search_str = search_str[4:]
-
-        elif search_str.startswith("@:"):
-            parts.append(self.private.email.lower())
-            parts.append(self.work.email.lower())
-            search_str = search_str[2:]
-
-        elif search_str.startswith("#:"):
-            parts.append(str(self.private.phone).lower())
-            parts.append(str(self.private.mobile).lower())
-            parts.append(str(self.private.fax).lower())
-            parts.append(str(self.work.phone).lower())
-            parts.append(str(self.work.mobile).lower())
-            parts.append(str(self.work.fax).lower())
-            search_str = search_str[2:]
+                return any(search_str in part for part in self.search_fields("phone"))
+        elif prefix == "@:" and "@" in search_str:
+            return any(email_matches(search_str, email) for email in self.search_fields("email"))
+        projection = self._projections.get(prefix)
+        if projection is None:
+            projection = self.search_projection(prefix)
+        if "\n" in search_str:
+            return any(search_str in part for part in projection.split("\n"))
+        return search_str in projection
+
+
+class LazyEntry(Entry):
+    """Entry that only keeps its summary in memory and loads its full data on first access.
+    The number of fully loaded lazy entries is limited by an LRU cache.
+    """
+
+    __slots__ = ("_summary", "_full")
+
+    cache_size = path_config.LAZY_CACHE_SIZE
+    """Maximum count of lazy entries holding their full data at the same time."""
+
+    summary_projections = ("", "row")
+    """Cached projections built from the summary only, the others are dropped when the entry gets unloaded."""
+
+    _loaded = OrderedDict()
+
+    def __init__(self, file:str, summary:dict) -> None: # pylint: disable=super-init-not-called
+        self.file = file
+        self._summary = summary
+        self._projections = {}
+        self._full = False
+
+    def __getattr__(self, name:str):
+        if name in ("personals", "private", "work", "notes"):
+            self.load_full()
+            return object.__getattribute__(self, name)
+        raise AttributeError(name)
+
+    def is_loaded(self) -> bool:
+        """Checks if the full data of the entry is currently in memory.
+        """
+        return self._full
 
+    def load_full(self) -> None:
+        """Loads the full data of the entry if needed and marks it as recently used.
+        """
+        if self.is_loaded():
+            LazyEntry._loaded.move_to_end(self)
+            return
+        dictionary = None
+        try:
+            dictionary = Entry.read_file(self.file)
+        except (OSError, ValueError) as ex:
+            # A missing or corrupt record leaves the entry empty instead of breaking a running search.
+            print("LazyEntry.load_full")
+            print(ex)
+        if dictionary is not None:
+            projections = self._projections
+            Entry.read_dict(self, dictionary)
+            self._projections = projections
+        else:
+            self.personals = Personals()
+            self.private = Contact(address=Address())
+            self.work = Contact(address=Address())
+            self.notes = []
+        self._mark_loaded()
+
+    def _mark_loaded(self) -> None:
+        self._full = True
+        LazyEntry._loaded[self] = True
+        while len(LazyEntry._loaded) > max(1, LazyEntry.cache_size):
+            oldest, _ = LazyEntry._loaded.popitem(last=False)
+            oldest.unload()
+
+    def read_dict(self, dictionary) -> None:
+        """Replaces the data of the entry, afterwards the entry counts as fully loaded.
+        """
+        super().read_dict(dictionary)
+        if self.is_loaded():
+            LazyEntry._loaded.move_to_end(self)
         else:
-            parts.append(self.personals.first_name.lower())
-            parts.append(self.personals.last_name.lower())
-            parts.append(self.personals.nickname.lower())
+            self._mark_loaded()
 
-        for part in parts:
-            if search_str in part:
-                return True
+    def unload(self) -> None:
+        """Drops the full data of the entry and only keeps its summary.
+        """
+        if self._full:
+            del self.personals
+            del self.private
+            del self.work
+            del self.notes
+            self._full = False
+        self._projections = {
+            prefix: projection for prefix, projection in self._projections.items()
+            if prefix in LazyEntry.summary_projections
+        }
+        LazyEntry._loaded.pop(self, None)
 
-        return False
+    def reload(self) -> None:
+        self.load_full()
+        super().reload()
+        self._summary = super().summary()
+
+    def save(self) -> bool:
+        self.load_full()
+        self._summary = super().summary()
+        return super().save()
+
+    def print(self) -> None:
+        self.load_full()
+        super().print()
+
+    def edit(self) -> None:
+        self.load_full()
+        super().edit()
+
+    def edit_details(self) -> None:
+        self.load_full()
+        super().edit_details()
+
+    def edit_note(self) -> None:
+        self.load_full()
+        super().edit_note()
+
+    def display(self) -> str:
+        if self.is_loaded():
+            return super().display()
+        return (self._summary["display"], self._summary["icon"])
+
+    def get_contact(self) -> str:
+        if self.is_loaded():
+            return super().get_contact()
+        return (self._summary["contact"], self._summary["contact_icon"])
+
+    def sort_key(self) -> str:
+        if self.is_loaded():
+            return super().sort_key()
+        return self._summary["sort_key"]
+
+    def summary(self) -> dict:
+        if self.is_loaded():
+            return super().summary()
+        return dict(self._summary)
+
+    def search_fields(self, group:str) -> list[str]:
+        if group == "name" and not self.is_loaded():
+            return [
+                self._summary["first_name"].lower(),
+                self._summary["last_name"].lower(),
+                self._summary["nickname"].lower()
+            ]
+        self.load_full()
+        return super().search_fields(group)
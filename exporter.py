@@ -0,0 +1,273 @@
+"""Contains a streaming exporter writing entries as vCard, CSV, JSON or JSON Lines.
+
+Every format is a generator yielding the text of one entry at a time, so the output is never
+built in memory. Large phonebooks can be split into shards written in parallel.
+
+Usage:
+    python exporter.py OUTPUT [--format csv|vcard|json|jsonl] [--search SEARCH] [--shards N]
+"""
+
+import io
+import os
+import argparse
+import csv
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from entry import Entry, FIELD_PATHS, NO_BIRTHDAY
+
+
+VCARD_LINE_LENGTH = 75
+
+
+def _csv_value(entry:Entry, field:str) -> str:
+    value = entry.get_field(field)
+    if field == "personals.birthday":
+        return "" if value == NO_BIRTHDAY else value.isoformat()
+    if field == "personals.male":
+        return "m" if value else "f"
+    if field == "notes":
+        return "\n".join(value)
+    return str(value)
+
+
+def iter_csv(entries, header:bool = True, delimiter:str = ","):
+    """Yields the lines of a CSV file with one column per field path (see entry.FIELD_PATHS).
+    The columns can be read again by the importer.
+
+    Args:
+        entries (iterable): the entries to export.
+        header (bool, optional): Set to False to omit the header line. Defaults to True.
+        delimiter (str, optional): the delimiter of the columns. Defaults to ",".
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=delimiter, lineterminator="\n")
+    if header:
+        writer.writerow(FIELD_PATHS)
+        yield buffer.getvalue()
+    for entry in entries:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([_csv_value(entry, field) for field in FIELD_PATHS])
+        yield buffer.getvalue()
+
+
+def _escape_vcard(value:str) -> str:
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _fold_vcard(line:str) -> str:
+    """Folds a vCard line into lines of at most VCARD_LINE_LENGTH characters.
+    """
+    if len(line) <= VCARD_LINE_LENGTH:
+        return line + "\r\n"
+    parts = [line[:VCARD_LINE_LENGTH]]
+    for i in range(VCARD_LINE_LENGTH, len(line), VCARD_LINE_LENGTH - 1):
+        parts.append(" " + line[i:i + VCARD_LINE_LENGTH - 1])
+    return "\r\n".join(parts) + "\r\n"
+
+
+def vcard(entry:Entry) -> str:
+    """Returns an entry as vCard 3.0.
+    """
+    personals = entry.personals
+    lines = [
+        "BEGIN:VCARD",
+        "VERSION:3.0",
+        "N:" + ";".join(_escape_vcard(value) for value in [personals.last_name, personals.first_name, "", personals.title, ""]),
+        "FN:" + _escape_vcard(entry.display()[0])
+    ]
+    if personals.nickname != "":
+        lines.append("NICKNAME:" + _escape_vcard(personals.nickname))
+    if personals.organisation != "":
+        lines.append("ORG:" + _escape_vcard(personals.organisation))
+    if personals.birthday != NO_BIRTHDAY:
+        lines.append("BDAY:" + personals.birthday.isoformat())
+    lines.append("X-GENDER:" + ("M" if personals.male else "F"))
+    for kind, contact in (("HOME", entry.private), ("WORK", entry.work)):
+        for field, types in (("phone", "VOICE"), ("mobile", "CELL"), ("fax", "FAX")):
+            if getattr(contact, field) != "":
+                lines.append(f"TEL;TYPE={kind},{types}:" + _escape_vcard(getattr(contact, field)))
+        if contact.email != "":
+            lines.append(f"EMAIL;TYPE=INTERNET,{kind}:" + _escape_vcard(contact.email))
+        address = contact.address
+        if not address.is_empty():
+            street = (address.street + " " + str(address.number)).strip()
+            parts = ["", "", street, address.city, address.state, address.zip_code, address.country]
+            lines.append(f"ADR;TYPE={kind}:" + ";".join(_escape_vcard(part) for part in parts))
+    if entry.notes:
+        lines.append("NOTE:" + _escape_vcard("\n".join(entry.notes)))
+    lines.append("END:VCARD")
+    return "".join(_fold_vcard(line) for line in lines)
+
+
+def iter_vcard(entries):
+    """Yields one vCard per entry.
+
+    Args:
+        entries (iterable): the entries to export.
+    """
+    for entry in entries:
+        yield vcard(entry)
+
+
+def json_record(entry:Entry) -> dict:
+    """Returns the entry data together with its storage key as "id".
+    """
+    record = {"id": Entry.storage_key(entry.file)}
+    record.update(entry.to_dict())
+    return record
+
+
+def iter_jsonl(entries):
+    """Yields one JSON object per line and entry (see json_record).
+
+    Args:
+        entries (iterable): the entries to export.
+    """
+    for entry in entries:
+        yield json.dumps(json_record(entry), ensure_ascii=False) + "\n"
+
+
+def iter_json(entries):
+    """Yields a JSON array holding one object per entry (see json_record), one element at a time.
+
+    Args:
+        entries (iterable): the entries to export.
+    """
+    separator = "[\n"
+    for entry in entries:
+        yield separator + json.dumps(json_record(entry), ensure_ascii=False)
+        separator = ",\n"
+    yield "[]\n" if separator == "[\n" else "\n]\n"
+
+
+FORMATS = {"csv": iter_csv, "vcard": iter_vcard, "json": iter_json, "jsonl": iter_jsonl}
+EXTENSIONS = {"csv": ".csv", "vcard": ".vcf", "json": ".json", "jsonl": ".jsonl"}
+
+
+def parse_limit(value:str) -> int:
+    """Argument type of the --limit options of the command line tools. 0 means no limit.
+
+    Raises:
+        argparse.ArgumentTypeError: if the value is no number or negative
+    """
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = -1
+    if limit < 0:
+        raise argparse.ArgumentTypeError(f"invalid limit \"{value}\", has to be 0 (no limit) or more")
+    return limit or None
+
+
+def export(entries, output, file_format:str = "csv") -> int:
+    """Writes entries to a file.
+
+    Args:
+        entries (iterable): the entries to export.
+        output (str or file): path of the file or an open text file (e.g. sys.stdout).
+        file_format (str, optional): "csv", "vcard", "json" or "jsonl". Defaults to "csv".
+
+    Returns:
+        int: count of exported entries
+    """
+    count = 0
+
+    def counted():
+        nonlocal count
+        for entry in entries:
+            count += 1
+            yield entry
+
+    if isinstance(output, str):
+        with open(output, "w", encoding="utf-8", newline="") as file:
+            file.writelines(FORMATS[file_format](counted()))
+    else:
+        output.writelines(FORMATS[file_format](counted()))
+    return count
+
+
+def shard_path(path:str, shard:int, shards:int) -> str:
+    """Returns the path of a shard (e.g. "export.csv" becomes "export.002-of-004.csv").
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}.{shard + 1:03d}-of-{shards:03d}{extension}"
+
+
+def export_sharded(entries, path:str, file_format:str = "csv", shards:int = 4, workers:int = None) -> list[str]:
+    """Splits entries into shards of about the same size and writes them in parallel.
+
+    Args:
+        entries (sequence): the entries to export. Needs to support len() and indexing (e.g. Database.contacts).
+        path (str): the path the shard paths are derived from (see shard_path).
+        file_format (str, optional): "csv", "vcard", "json" or "jsonl". Defaults to "csv".
+        shards (int, optional): count of shards. Defaults to 4.
+        workers (int, optional): count of shards written at the same time. Defaults to shards.
+
+    Returns:
+        list[str]: the paths of the written shards
+    """
+    count = len(entries)
+    bounds = [count * shard // shards for shard in range(shards + 1)]
+    paths = [shard_path(path, shard, shards) for shard in range(shards)]
+
+    def write(shard:int) -> int:
+        start, stop = bounds[shard], bounds[shard + 1]
+        return export((entries[i] for i in range(start, stop)), paths[shard], file_format)
+
+    with ThreadPoolExecutor(max_workers=workers or shards) as executor:
+        list(executor.map(write, range(shards)))
+    return paths
+
+
+def export_database(database, output, file_format:str = "csv", search_str:str = None, shards:int = 1) -> int:
+    """Exports all entries of a database or the result of a search.
+    The database is locked while exporting, so a running FolderWatcher can not change the entries meanwhile.
+
+    Args:
+        database (Database): the database to export.
+        output (str or file): path of the file or an open text file. Shards need a path.
+        file_format (str, optional): "csv", "vcard", "json" or "jsonl". Defaults to "csv".
+        search_str (str, optional): only export the result of this search. Defaults to None.
+        shards (int, optional): count of shards written in parallel. Defaults to 1.
+
+    Returns:
+        int: count of exported entries
+    """
+    with database.lock:
+        entries = database.contacts if search_str is None else database.search(search_str)
+        if shards > 1:
+            export_sharded(entries, output, file_format, shards)
+            return len(entries)
+        return export(entries, output, file_format)
+
+
+if __name__ == "__main__":
+    import argparse
+    import contextlib
+    from database import Database
+
+    def main():
+        """Exports the phonebook from the command line.
+        """
+        parser = argparse.ArgumentParser(description="Exports the phonebook as vCard, CSV or JSON Lines.")
+        parser.add_argument("output", help="the output file or - for stdout")
+        parser.add_argument("--format", choices=list(FORMATS), default=None,
+                            help="default: detected by the file extension, csv for stdout")
+        parser.add_argument("--search", default=None, help="only export the result of this search")
+        parser.add_argument("--shards", type=int, default=1, help="count of files written in parallel")
+        args = parser.parse_args()
+        file_format = args.format
+        if file_format is None:
+            extension = os.path.splitext(args.output)[1].lower()
+            file_format = {value: key for key, value in EXTENSIONS.items()}.get(extension, "csv")
+        if args.output == "-" and args.shards > 1:
+            parser.error("shards can not be written to stdout")
+        with contextlib.redirect_stdout(sys.stderr):
+            database = Database()
+        output = sys.stdout if args.output == "-" else args.output
+        count = export_database(database, output, file_format, args.search, args.shards)
+        print(f"Exported {count} contacts.", file=sys.stderr)
+    main()
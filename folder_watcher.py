@@ -0,0 +1,51 @@
+"""Contains a background thread keeping a running database in sync with its phonebook folder.
+"""
+
+import time
+import threading
+
+import path_config
+
+
+class FolderWatcher(threading.Thread):
+    """Background thread polling the phonebook folder and applying changes made by other programs.
+
+    Every interval the modification time of the folder gets checked. New, renamed or deleted files
+    change it and trigger a scan. Since files written in place do not change the folder, a full
+    scan comparing the stats of all files is done every full scan interval.
+    """
+
+    def __init__(
+        self,
+        database,
+        interval:float = path_config.WATCH_INTERVAL,
+        full_scan_interval:float = path_config.WATCH_FULL_SCAN_INTERVAL
+    ) -> None:
+        """Creates the watcher. Call start() to run it.
+
+        Args:
+            database (Database): the database to keep in sync.
+            interval (float, optional): seconds between two checks. Defaults to path_config.WATCH_INTERVAL.
+            full_scan_interval (float, optional): seconds between two full scans. Defaults to path_config.WATCH_FULL_SCAN_INTERVAL.
+        """
+        super().__init__(name="FolderWatcher", daemon=True)
+        self.database = database
+        self.interval = interval
+        self.full_scan_interval = full_scan_interval
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        last_full_scan = time.monotonic()
+        while not self._stop_event.wait(self.interval):
+            full_scan = time.monotonic() - last_full_scan >= self.full_scan_interval
+            if full_scan:
+                last_full_scan = time.monotonic()
+            try:
+                self.database.sync(full_scan)
+            except OSError:
+                pass
+
+    def stop(self) -> None:
+        """Stops the watcher.
+        """
+        self._stop_event.set()
@@ -0,0 +1,213 @@
+"""Contains a seeded generator for large phonebooks of synthetic contacts.
+
+The first and last names of random-names.txt are combined freely, so far more distinct
+names than lines of the file are possible. Entries are created in batches, each batch using
+its own random generator derived from the seed. Thereby the same seed always creates the
+same phonebook, no matter how many workers write it.
+
+Usage:
+    python generator.py COUNT [--seed N] [--work R] [--address R] [--notes R] [--workers N] [--batch-size N]
+"""
+
+import os
+import uuid
+import datetime
+import random as rnd
+from os.path import join, dirname, abspath
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import path_config
+from entry import Entry, GroupCommit
+
+
+NAMES_FILE = join(dirname(abspath(__file__)), "random-names.txt")
+BATCH_SIZE = 1000
+
+TITLES = ["", "", "", "", "", "Dr.", "Prof.", "Ing."]
+NICKNAMES = ["Bear", "Ace", "Sunny", "Doc", "Red", "Kid", "Max", "Bo"]
+ORGANISATIONS = ["Acme Inc.", "Example Ltd.", "Initech", "Globex", "Umbrella Corp.", "Stark Industries"]
+STREETS = ["Main Street", "Hauptstraße", "Bahnhofstraße", "Elm Street", "Park Avenue", "Schillerstraße"]
+CITIES = [
+    ("Berlin", "Berlin", "Germany"), ("Hamburg", "Hamburg", "Germany"), ("Munich", "Bavaria", "Germany"),
+    ("Springfield", "Illinois", "USA"), ("Portland", "Oregon", "USA"), ("Vienna", "Vienna", "Austria")
+]
+NOTES = [
+    "Met at the conference.", "Prefers calls in the evening.", "Birthday present: books.",
+    "Ask about the new project.", "Knows the neighbours.", "Old friend from school."
+]
+
+
+def load_names(path:str = NAMES_FILE) -> tuple:
+    """Reads the first and last names of a names file with one "first last" name per line.
+
+    Returns:
+        (list[str], list[str]): the first names and the last names
+    """
+    first_names = []
+    last_names = []
+    with open(path, "r", encoding="utf-8") as names_file:
+        for line in names_file:
+            names = line.strip().split(" ")
+            if len(names) >= 2:
+                first_names.append(names[0])
+                last_names.append(names[1])
+    return (first_names, last_names)
+
+
+def random_entry(rand:rnd.Random, names:tuple, folder:str, work:float = 0.3, address:float = 0.5,
+                 notes:float = 0.1) -> Entry:
+    """Creates one random entry.
+
+    Args:
+        rand (Random): the random generator to use.
+        names (tuple): first and last names returned by load_names.
+        folder (str): the phonebook folder the entry belongs to.
+        work (float, optional): ratio of entries with an organisation and work contact. Defaults to 0.3.
+        address (float, optional): ratio of entries with an address. Defaults to 0.5.
+        notes (float, optional): ratio of entries with notes. Defaults to 0.1.
+
+    Returns:
+        Entry: the new entry (not saved)
+    """
+    first_names, last_names = names
+    name = str(uuid.UUID(int=rand.getrandbits(128), version=4))
+    new = Entry(join(folder, name + path_config.FILE_EXTENSINON))
+    first_name = rand.choice(first_names)
+    last_name = rand.choice(last_names)
+    new.personals.first_name = first_name
+    new.personals.last_name = last_name
+    new.personals.title = rand.choice(TITLES)
+    if rand.random() < 0.05:
+        new.personals.nickname = rand.choice(NICKNAMES)
+    new.personals.birthday = datetime.date(rand.randrange(1940, 2008), rand.randrange(1, 13), rand.randrange(1, 29))
+    new.personals.male = rand.random() < 0.5
+    new.private.phone = "0" + str(rand.randrange(1000000000, 1999999999))
+    new.private.mobile = "+49176" + str(rand.randrange(1000000, 9999999))
+    new.private.email = (first_name[0] + "." + last_name + str(rand.randrange(10, 9999)) + "@example.com").lower()
+    if rand.random() < address:
+        new.private.address.street = rand.choice(STREETS)
+        new.private.address.number = str(rand.randrange(1, 200))
+        new.private.address.zip_code = str(rand.randrange(10000, 99999))
+        new.private.address.city, new.private.address.state, new.private.address.country = rand.choice(CITIES)
+    if rand.random() < work:
+        organisation = rand.choice(ORGANISATIONS)
+        domain = organisation.lower().replace(" ", "").replace(".", "") + ".com"
+        new.personals.organisation = organisation
+        new.work.phone = "0" + str(rand.randrange(1000000000, 1999999999))
+        new.work.email = (first_name + "." + last_name + "@" + domain).lower()
+        if rand.random() < address:
+            new.work.address.street = rand.choice(STREETS)
+            new.work.address.number = str(rand.randrange(1, 200))
+            new.work.address.zip_code = str(rand.randrange(10000, 99999))
+            new.work.address.city, new.work.address.state, new.work.address.country = rand.choice(CITIES)
+    if rand.random() < notes:
+        new.notes = rand.sample(NOTES, rand.randrange(1, 4))
+    return new
+
+
+def batch_random(seed:int, batch:int) -> rnd.Random:
+    """Returns the random generator of a batch.
+    """
+    return rnd.Random(seed * 1000003 + batch)
+
+
+def iter_entries(count:int, seed:int = 0, folder:str = None, batch_size:int = BATCH_SIZE, **ratios):
+    """Yields random entries without saving them. The same entries are created by generate.
+
+    Args:
+        count (int): count of entries to create.
+        seed (int, optional): seed of the random generators. Defaults to 0.
+        folder (str, optional): the phonebook folder. Defaults to path_config.get_folder_path().
+        batch_size (int, optional): count of entries per batch. Defaults to BATCH_SIZE.
+        **ratios: work, address and notes ratios (see random_entry)
+    """
+    if folder is None:
+        folder = path_config.get_folder_path()
+    names = load_names()
+    for batch, start in enumerate(range(0, count, batch_size)):
+        rand = batch_random(seed, batch)
+        for _ in range(start, min(count, start + batch_size)):
+            yield random_entry(rand, names, folder, **ratios)
+
+
+def _write_batch(job:tuple) -> int:
+    seed, batch, size, folder, names, ratios = job
+    if GroupCommit.active() is None:
+        # Running inside a worker thread or process, each batch gets synced as one group.
+        with GroupCommit():
+            return _write_batch(job)
+    rand = batch_random(seed, batch)
+    for _ in range(size):
+        random_entry(rand, names, folder, **ratios).save()
+    return size
+
+
+def generate(count:int, seed:int = 0, folder:str = None, workers:int = None, use_processes:bool = None,
+             batch_size:int = BATCH_SIZE, storage = None, **ratios) -> int:
+    """Writes a phonebook of random entries.
+
+    Args:
+        count (int): count of entries to create.
+        seed (int, optional): seed of the random generators. Defaults to 0.
+        folder (str, optional): the phonebook folder. Defaults to path_config.get_folder_path().
+        workers (int, optional): count of batches written in parallel. Defaults to path_config.LOAD_WORKERS.
+        use_processes (bool, optional): Set to True to use a process pool instead of a thread pool.
+                                        Defaults to path_config.LOAD_USE_PROCESSES.
+        batch_size (int, optional): count of entries per batch. Defaults to BATCH_SIZE.
+        storage (optional): Storage backend (e.g. a PackStorage) to write to instead of the folder.
+                            Storage backends are written by a single worker.
+        **ratios: work, address and notes ratios (see random_entry)
+
+    Returns:
+        int: count of written entries
+    """
+    if folder is None:
+        folder = path_config.get_folder_path()
+    if workers is None:
+        workers = path_config.LOAD_WORKERS
+    if use_processes is None:
+        use_processes = path_config.LOAD_USE_PROCESSES
+    if storage is not None:
+        written = 0
+        for entry in iter_entries(count, seed, folder, batch_size, **ratios):
+            storage.put(Entry.storage_key(entry.file), entry.to_dict())
+            written += 1
+        return written
+    os.makedirs(folder, exist_ok=True)
+    names = load_names()
+    jobs = [
+        (seed, batch, min(batch_size, count - start), folder, names, ratios)
+        for batch, start in enumerate(range(0, count, batch_size))
+    ]
+    with GroupCommit():
+        if workers <= 1 or len(jobs) <= 1:
+            return sum(_write_batch(job) for job in jobs)
+        executor_class = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor_class(max_workers=min(workers, len(jobs))) as executor:
+            return sum(executor.map(_write_batch, jobs))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    def main():
+        """Generates a phonebook from the command line.
+        """
+        parser = argparse.ArgumentParser(description="Generates a phonebook of random contacts.")
+        parser.add_argument("count", type=int, help="count of contacts to create")
+        parser.add_argument("--seed", type=int, default=0, help="seed of the random generator")
+        parser.add_argument("--work", type=float, default=0.3, help="ratio of contacts with work details")
+        parser.add_argument("--address", type=float, default=0.5, help="ratio of contacts with an address")
+        parser.add_argument("--notes", type=float, default=0.1, help="ratio of contacts with notes")
+        parser.add_argument("--workers", type=int, default=None, help="count of batches written in parallel")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="count of contacts per batch")
+        parser.add_argument("--folder", default=None, help="target folder (default: the phonebook folder)")
+        args = parser.parse_args()
+        start = time.perf_counter()
+        written = generate(
+            args.count, args.seed, args.folder, args.workers, batch_size=args.batch_size,
+            work=args.work, address=args.address, notes=args.notes
+        )
+        print(f"Generated {written} contacts in {time.perf_counter() - start:.1f} seconds.")
+    main()
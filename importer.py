@@ -0,0 +1,425 @@
+"""Contains a streaming importer for contacts stored as CSV or vCard files.
+
+Records are read one by one, converted into entries, validated using the validators of the
+input_lib and written in batches. Only a single batch is kept in memory at any time.
+
+Usage:
+    python importer.py FILE [--format csv|vcard] [--invalid reject|drop|keep] [--batch-size N] [--delimiter ,]
+"""
+
+import os
+import re
+import csv
+from datetime import date
+
+import path_config
+from entry import Entry, GroupCommit, FIELD_PATHS
+from pack_storage import PackStorage
+from sqlite_storage import SqliteStorage
+from input_lib import DATE_REX, is_phone_number, is_email
+
+
+BATCH_SIZE = 1000
+MAX_ERRORS = 100
+INVALID_POLICIES = ("reject", "drop", "keep")
+
+CSV_ALIASES = {
+    "first name": "personals.first_name", "given name": "personals.first_name", "firstname": "personals.first_name",
+    "last name": "personals.last_name", "family name": "personals.last_name", "surname": "personals.last_name",
+    "lastname": "personals.last_name",
+    "title": "personals.title", "prefix": "personals.title",
+    "nickname": "personals.nickname",
+    "organisation": "personals.organisation", "organization": "personals.organisation", "company": "personals.organisation",
+    "birthday": "personals.birthday", "birth date": "personals.birthday",
+    "male": "personals.male", "gender": "personals.male", "sex": "personals.male",
+    "phone": "private.phone", "home phone": "private.phone", "telephone": "private.phone",
+    "mobile": "private.mobile", "mobile phone": "private.mobile", "cell": "private.mobile", "cell phone": "private.mobile",
+    "fax": "private.fax", "home fax": "private.fax",
+    "email": "private.email", "e mail": "private.email", "email address": "private.email", "home email": "private.email",
+    "street": "private.address.street", "home street": "private.address.street",
+    "number": "private.address.number", "house number": "private.address.number",
+    "zip": "private.address.zip_code", "zip code": "private.address.zip_code", "postal code": "private.address.zip_code",
+    "city": "private.address.city", "home city": "private.address.city",
+    "state": "private.address.state", "home state": "private.address.state",
+    "country": "private.address.country", "home country": "private.address.country",
+    "work phone": "work.phone", "business phone": "work.phone",
+    "work mobile": "work.mobile",
+    "work fax": "work.fax", "business fax": "work.fax",
+    "work email": "work.email", "business email": "work.email",
+    "work street": "work.address.street", "business street": "work.address.street",
+    "work number": "work.address.number",
+    "work zip": "work.address.zip_code", "work zip code": "work.address.zip_code", "business postal code": "work.address.zip_code",
+    "work city": "work.address.city", "business city": "work.address.city",
+    "work state": "work.address.state", "business state": "work.address.state",
+    "work country": "work.address.country", "business country": "work.address.country",
+    "notes": "notes", "note": "notes"
+}
+"""Known CSV column names mapped to the fields of an entry. The dotted field paths themselves are accepted as well."""
+
+
+def normalize_header(header:str) -> str:
+    """Returns a column name in the form used by CSV_ALIASES.
+    """
+    return header.strip().lower().replace("_", " ").replace("-", " ")
+
+
+def read_csv(path:str, mapping:dict = None, delimiter:str = ","):
+    """Reads the records of a CSV file with a header line.
+
+    Args:
+        path (str): the CSV file.
+        mapping (dict, optional): column names mapped to field paths. Defaults to the known names of CSV_ALIASES.
+        delimiter (str, optional): the delimiter of the columns. Defaults to ",".
+
+    Yields:
+        dict: the values of each record keyed by their field path
+    """
+    if mapping is None:
+        mapping = dict(CSV_ALIASES)
+        mapping.update({path: path for path in FIELD_PATHS})
+    mapping = {normalize_header(column): field for column, field in mapping.items()}
+    with open(path, "r", encoding="utf-8-sig", newline="") as csv_file:
+        reader = csv.reader(csv_file, delimiter=delimiter)
+        header = next(reader, None)
+        if header is None:
+            return
+        fields = [mapping.get(normalize_header(column)) for column in header]
+        for row in reader:
+            record = {}
+            for field, value in zip(fields, row):
+                if field is not None and value.strip() != "":
+                    record[field] = value.strip()
+            yield record
+
+
+def _unescape_vcard(value:str) -> str:
+    return value.replace("\\n", "\n").replace("\\N", "\n").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+
+
+def _split_vcard(value:str, separator:str = ";") -> list[str]:
+    parts = re.split(r"(?<!\\)" + re.escape(separator), value)
+    return [_unescape_vcard(part).strip() for part in parts]
+
+
+def _vcard_lines(vcard_file):
+    """Yields the logical lines of a vCard file with folded lines joined again.
+    """
+    current = None
+    for line in vcard_file:
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _vcard_property(line:str) -> tuple:
+    """Splits a vCard line into its name, its lower case type parameters and its value.
+    """
+    head, _, value = line.partition(":")
+    parts = head.split(";")
+    name = parts[0].rpartition(".")[2].upper()
+    types = set()
+    for parameter in parts[1:]:
+        key, equals, values = parameter.partition("=")
+        if equals == "":
+            types.add(key.lower())
+        elif key.upper() == "TYPE":
+            types.update(part.strip('"').lower() for part in values.split(","))
+    return (name, types, value)
+
+
+def _set_first(record:dict, fields:list[str], value:str) -> None:
+    for field in fields:
+        if field not in record:
+            record[field] = value
+            return
+
+
+def _vcard_phone(value:str) -> str:
+    """Returns the number of a TEL value. tel: URIs (vCard 4.0) lose their scheme, their
+    parameters (e.g. ";ext=12") and their visual separators.
+    """
+    value = _unescape_vcard(value).strip()
+    if value.lower().startswith("tel:"):
+        number = value[4:].partition(";")[0]
+        return "".join(char for char in number if char.isdigit() or char == "+")
+    return value
+
+
+def _vcard_date(value:str) -> str:
+    """Returns the date of a BDAY value or None for the partial dates of vCard 4.0 without
+    a year, month or day (e.g. "--0415", "---15", "1985" or "1985-04"). A time of the day gets removed.
+    """
+    value = value.strip().partition("T")[0]
+    if value.startswith("--") or re.fullmatch(r"\d{4}(-\d{2})?", value):
+        return None
+    return value
+
+
+def read_vcard(path:str):
+    """Reads the cards of a vCard file (version 2.1, 3.0 or 4.0).
+    Birthdays without a full date are skipped instead of rejecting the card.
+
+    Args:
+        path (str): the vCard file.
+
+    Yields:
+        dict: the values of each card keyed by their field path
+    """
+    with open(path, "r", encoding="utf-8-sig") as vcard_file:
+        record = None
+        for line in _vcard_lines(vcard_file):
+            if line.strip() == "":
+                continue
+            name, types, value = _vcard_property(line)
+            if name == "BEGIN" and value.strip().upper() == "VCARD":
+                record = {}
+                continue
+            if record is None:
+                continue
+            if name == "END":
+                yield record
+                record = None
+            elif name == "N":
+                parts = _split_vcard(value) + [""] * 5
+                record["personals.last_name"] = parts[0]
+                record["personals.first_name"] = parts[1]
+                if parts[3] != "":
+                    record["personals.title"] = parts[3]
+            elif name == "FN" and "personals.first_name" not in record:
+                first_name, _, last_name = _unescape_vcard(value).strip().partition(" ")
+                record["personals.first_name"] = first_name
+                record["personals.last_name"] = last_name
+            elif name == "NICKNAME":
+                record["personals.nickname"] = _split_vcard(value, ",")[0]
+            elif name == "ORG":
+                record["personals.organisation"] = _split_vcard(value)[0]
+            elif name == "BDAY":
+                birthday = _vcard_date(value)
+                if birthday is not None:
+                    record["personals.birthday"] = birthday
+            elif name in ("GENDER", "X-GENDER"):
+                record["personals.male"] = _split_vcard(value)[0]
+            elif name == "TEL":
+                kinds = ["work", "private"] if "work" in types else ["private", "work"]
+                kind = "mobile" if "cell" in types else "fax" if "fax" in types else "phone"
+                _set_first(record, [prefix + "." + kind for prefix in kinds], _vcard_phone(value))
+            elif name == "EMAIL":
+                kinds = ["work", "private"] if "work" in types else ["private", "work"]
+                _set_first(record, [prefix + ".email" for prefix in kinds], _unescape_vcard(value).strip())
+            elif name == "ADR":
+                kind = "work" if "work" in types else "private"
+                if kind + ".address.street" in record:
+                    continue
+                parts = _split_vcard(value) + [""] * 7
+                for field, part in zip(("street", "city", "state", "zip_code", "country"), parts[2:7]):
+                    if part != "":
+                        record[kind + ".address." + field] = part
+            elif name == "NOTE":
+                record["notes"] = _unescape_vcard(value)
+
+
+def parse_date(value:str) -> date:
+    """Parses a date in the format yyyy-mm-dd (or yyyymmdd as used by vCards).
+
+    Raises:
+        ValueError: if the value is no valid date
+    """
+    value = value.strip()
+    if re.fullmatch(r"\d{8}", value):
+        value = value[:4] + "-" + value[4:6] + "-" + value[6:]
+    match = DATE_REX.match(value)
+    if match is None:
+        raise ValueError(f"invalid date \"{value}\"")
+    return date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+
+def parse_male(value:str) -> bool:
+    """Parses a gender value ("m", "male", "f", "female", "w", ...).
+
+    Raises:
+        ValueError: if the value is unknown
+    """
+    value = value.strip().lower()
+    if value in ("m", "male", "man", "true", "1", "yes"):
+        return True
+    if value in ("f", "w", "female", "woman", "false", "0", "no"):
+        return False
+    raise ValueError(f"invalid gender \"{value}\"")
+
+
+def validate(field:str, value:str) -> bool:
+    """Checks a value using the validator the edit dialogs use for the field.
+    """
+    name = field.rpartition(".")[2]
+    if name in ("phone", "mobile", "fax"):
+        return is_phone_number(value)
+    if name == "email":
+        return is_email(value)
+    return True
+
+
+def build_entry(record:dict, invalid:str = "reject") -> tuple:
+    """Creates an entry from an imported record.
+
+    Args:
+        record (dict): the values of the record keyed by their field path.
+        invalid (str, optional): What to do with invalid values. "reject" skips the record, "drop" skips the value
+                                 and "keep" imports the value anyway. Defaults to "reject".
+
+    Returns:
+        (Entry, list[str]): the new entry (or None if it was rejected) and the errors found
+    """
+    entry = Entry()
+    errors = []
+    for field, value in record.items():
+        try:
+            if field == "personals.birthday":
+                value = parse_date(value)
+            elif field == "personals.male":
+                value = parse_male(value)
+            elif field == "notes":
+                value = [line for line in value.splitlines() if line.strip() != ""]
+            elif not validate(field, value):
+                raise ValueError(f"invalid {field} \"{value}\"")
+        except ValueError as ex:
+            errors.append(str(ex))
+            if invalid == "reject":
+                continue
+            if invalid == "drop" or field in ("personals.birthday", "personals.male"):
+                continue
+        entry.set_field(field, value)
+    if errors and invalid == "reject":
+        return (None, errors)
+    if entry.is_empty():
+        return (None, errors + ["empty record"])
+    return (entry, errors)
+
+
+class ImportReport:
+    """Result of an import.
+    """
+
+    def __init__(self) -> None:
+        self.imported = 0
+        self.rejected = 0
+        self.warnings = 0
+        self.errors = []
+        """The first MAX_ERRORS errors as (record number, message) tuples."""
+
+    def add_error(self, record:int, message:str) -> None:
+        """Records an error of a record.
+        """
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((record, message))
+
+
+def import_records(records, database = None, batch_size:int = BATCH_SIZE, invalid:str = "reject") -> ImportReport:
+    """Saves imported records as new entries.
+
+    Args:
+        records (iterable): the records as yielded by read_csv or read_vcard.
+        database (Database, optional): a running database the entries get inserted into. Defaults to None.
+        batch_size (int, optional): count of entries written and inserted at once. Defaults to BATCH_SIZE.
+        invalid (str, optional): What to do with invalid values (see build_entry). Defaults to "reject".
+
+    Returns:
+        ImportReport: counts of imported and rejected records
+    """
+    if invalid not in INVALID_POLICIES:
+        raise ValueError(f"invalid must be one of {INVALID_POLICIES}")
+    report = ImportReport()
+    batch = []
+    if Entry.storage is None:
+        os.makedirs(path_config.get_folder_path(), exist_ok=True)
+
+    def flush() -> None:
+        put_many = getattr(Entry.storage, "put_many", None)
+        if put_many is not None:
+            # The storage backend writes the whole batch at once (e.g. one transaction of a SqliteStorage).
+            try:
+                put_many([(Entry.storage_key(entry.file), entry.to_dict()) for entry in batch])
+                saved = list(batch)
+            except PermissionError as ex:
+                print("importer.import_records")
+                print(ex)
+                saved = []
+        else:
+            with GroupCommit():
+                saved = [entry for entry in batch if entry.save()]
+        if database is not None:
+            database.insert_entries(saved)
+        report.imported += len(saved)
+        report.rejected += len(batch) - len(saved)
+        batch.clear()
+
+    for number, record in enumerate(records, 1):
+        entry, errors = build_entry(record, invalid)
+        for error in errors:
+            report.add_error(number, error)
+        if entry is None:
+            report.rejected += 1
+            continue
+        if errors:
+            report.warnings += 1
+        batch.append(entry)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return report
+
+
+def import_file(path:str, database = None, file_format:str = None, batch_size:int = BATCH_SIZE,
+                invalid:str = "reject", mapping:dict = None, delimiter:str = ",") -> ImportReport:
+    """Imports a CSV or vCard file.
+
+    Args:
+        path (str): the file to import.
+        database (Database, optional): a running database the entries get inserted into. Defaults to None.
+        file_format (str, optional): "csv" or "vcard". Defaults to the format matching the file extension.
+        batch_size (int, optional): count of entries written and inserted at once. Defaults to BATCH_SIZE.
+        invalid (str, optional): What to do with invalid values (see build_entry). Defaults to "reject".
+        mapping (dict, optional): CSV column names mapped to field paths (see read_csv). Defaults to None.
+        delimiter (str, optional): the delimiter of CSV columns. Defaults to ",".
+
+    Returns:
+        ImportReport: counts of imported and rejected records
+    """
+    if file_format is None:
+        file_format = "vcard" if path.lower().endswith((".vcf", ".vcard")) else "csv"
+    if file_format == "vcard":
+        records = read_vcard(path)
+    else:
+        records = read_csv(path, mapping, delimiter)
+    return import_records(records, database, batch_size, invalid)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    def main():
+        """Imports a file into the phonebook from the command line.
+        """
+        parser = argparse.ArgumentParser(description="Imports contacts from a CSV or vCard file.")
+        parser.add_argument("file", help="the file to import")
+        parser.add_argument("--format", choices=["csv", "vcard"], default=None, help="default: detected by the file extension")
+        parser.add_argument("--invalid", choices=INVALID_POLICIES, default="reject",
+                            help="reject the record, drop the value or keep the value if it is invalid")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="count of contacts written at once")
+        parser.add_argument("--delimiter", default=",", help="delimiter of CSV columns")
+        args = parser.parse_args()
+        if path_config.STORAGE_BACKEND == "pack":
+            Entry.storage = PackStorage(path_config.get_pack_path())
+        elif path_config.STORAGE_BACKEND == "sqlite":
+            Entry.storage = SqliteStorage(path_config.get_sqlite_path())
+        report = import_file(args.file, None, args.format, args.batch_size, args.invalid, delimiter=args.delimiter)
+        for record, message in report.errors:
+            print(f"Record {record}: {message}")
+        print(f"Imported {report.imported} contacts, {report.rejected} rejected, {report.warnings} with warnings.")
+    main()
@@ -11,6 +11,11 @@ EMAIL_PATTERN = (
     r"^(([^<>()\[\]\\.,;:\s@\"]+(\.[^<>()\[\]\\.,;:\s@\"]+)*)|(\".+\"))@((\[[0-9]{1,3}\." +
     r"[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}])|(([a-zA-Z\-0-9]+\.)+[a-zA-Z]{2,}))$"
 )
+DATE_REX = re.compile(DATE_PATTERN)
+PHONE_NR_REX = re.compile(PHONE_NR_PATTERN)
+EMAIL_REX = re.compile(EMAIL_PATTERN)
+MAX_EMAIL_LENGTH = 254
+MAX_PHONE_NR_LENGTH = 32
 ABORT_INPUT_KEY_SEQUENCE = '\x01' # ^A
 EXIT_INPUT_KEY_SEQUENCE = '\x18' # ^E
 DELETE_INPUT_KEY_SQEUNECE = '\x04' # ^D
@@ -65,10 +70,101 @@ class HelpOutput:
         HelpOutput._help_out()
 
 
+# Parts of EMAIL_PATTERN without nested or overlapping quantifiers, each of them matches in linear time.
+_EMAIL_LOCAL_REX = re.compile(r"[^<>()\[\]\\.,;:\s@\"]+(?:\.[^<>()\[\]\\.,;:\s@\"]+)*|\".+\"")
+_EMAIL_DOMAIN_REX = re.compile(r"\[[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}\.[0-9]{1,3}]|(?:[a-zA-Z\-0-9]+\.)+[a-zA-Z]{2,}")
+
+
+def is_phone_number(value:str) -> bool:
+    """Checks a phone number using PHONE_NR_PATTERN.
+    The pattern only has bounded quantifiers and never reads more than 18 characters, so the check
+    takes constant time no matter how long the value is.
+
+    Args:
+        value (str): the phone number to check.
+
+    Returns:
+        bool: True if the value is a valid phone number
+    """
+    return len(value) <= MAX_PHONE_NR_LENGTH and PHONE_NR_REX.match(value) is not None
+
+
+def is_email(value:str) -> bool:
+    """Checks an E-Mail address like EMAIL_PATTERN does, in linear time. Addresses longer than
+    MAX_EMAIL_LENGTH (the limit of RFC 5321) are rejected.
+    The address is split at the last "@" (the domain can not contain one), then the local part
+    and the domain are matched separately, so hostile input can not cause any backtracking
+    between the two.
+
+    Args:
+        value (str): the E-Mail address to check.
+
+    Returns:
+        bool: True if the value is a valid E-Mail address
+    """
+    if len(value) > MAX_EMAIL_LENGTH:
+        return False
+    local, at, domain = value.rpartition("@")
+    return (
+        at != "" and _EMAIL_DOMAIN_REX.fullmatch(domain) is not None and
+        _EMAIL_LOCAL_REX.fullmatch(local) is not None
+    )
+
+
+def is_date(value:str) -> bool:
+    """Checks a date like DATE_PATTERN does (the date itself may still be invalid, e.g. 2001-02-30).
+    """
+    return DATE_REX.match(value) is not None
+
+
+VALIDATORS = {
+    PHONE_NR_PATTERN: is_phone_number,
+    EMAIL_PATTERN: is_email,
+    DATE_PATTERN: is_date
+}
+
+
+def get_validator(pattern):
+    """Returns a function checking a string.
+
+    Args:
+        pattern (str, Pattern or callable): a regular expression, a compiled regular expression or
+                                            a function returning True for valid strings.
+                                            The patterns of this module are replaced by their linear-time validators.
+
+    Returns:
+        callable: the function returning True for valid strings
+    """
+    if callable(pattern):
+        return pattern
+    if isinstance(pattern, str):
+        if pattern in VALIDATORS:
+            return VALIDATORS[pattern]
+        pattern = re.compile(pattern)
+    return lambda value: pattern.match(value) is not None
+
+
+def validate_column(values, pattern, skip_empty:bool = True) -> list[int]:
+    """Validates a whole column of values (e.g. all phone numbers of an import) at once.
+
+    Args:
+        values (iterable[str]): the values to check.
+        pattern (str, Pattern or callable): the validator (see get_validator).
+        skip_empty (bool, optional): Set to False to report empty values too. Defaults to True.
+
+    Returns:
+        list[int]: the positions of the invalid values
+    """
+    check = get_validator(pattern)
+    if skip_empty:
+        return [i for i, value in enumerate(values) if value != "" and not check(value)]
+    return [i for i, value in enumerate(values) if not check(value)]
+
+
 def input_rex(
     label:str = "",
     error:str = "Entered string musst match the pattern!",
-    pattern:str = ".*",
+    pattern = ".*",
     default:str = "",
     show_default:bool = False,
     default_display = lambda d: f" ({d})",
@@ -80,6 +176,7 @@ def input_rex(
         label (str, optional): Gets displayed in front of the input. Defaults to "".
         error (str, optional): Gets displayed if the input does not match the expression. Defaults to "Entered string musst match the pattern!".
         pattern (str, optional): the regular expression that will be matched aginst the input. Defaults to ".*".
+                                 Can also be a compiled expression or a validator function (see get_validator).
         default (str, optional): the default value that gets returned if the user cancels by inputing nothing. Defaults to "".
 
     Returns:
@@ -91,6 +188,7 @@ def input_rex(
             label = label % value_display
         else:
             label = label % ""
+    check = get_validator(pattern)
     while True:
         line = input(label)
         if line == ABORT_INPUT_KEY_SEQUENCE:
@@ -103,7 +201,7 @@ def input_rex(
             return empty_value
         if line.strip() == "":
             return default
-        if re.match(pattern, line) is None:
+        if not check(line):
             print(error)
         else:
             return line
@@ -132,7 +230,7 @@ def input_date(
         else:
             label = label % ""
     while True:
-        line = input_rex(label, "Please use format: yyyy-mm-dd", DATE_PATTERN, "")
+        line = input_rex(label, "Please use format: yyyy-mm-dd", is_date, "")
         if line == ABORT_INPUT_KEY_SEQUENCE:
             raise InputAbortException()
         if line == EXIT_INPUT_KEY_SEQUENCE:
@@ -143,7 +241,7 @@ def input_date(
             return empty_value
         if line.strip() == "":
             return default
-        match = re.match(DATE_PATTERN, line)
+        match = DATE_REX.match(line)
         year = int(match[1])
         month = int(match[2])
         day = int(match[3])
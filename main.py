@@ -1,38 +1,57 @@
 """Main Phonebook script
+
+Usage:
+    python main.py
+    python main.py query SEARCH [--format json|jsonl|csv|vcard] [--limit N]
 """
 
 import os
+import sys
 import math
+import argparse
+import contextlib
+import path_config
+import exporter
 from database import Database
+from folder_watcher import FolderWatcher
+from search_cursor import SearchCursor
+from screen import Screen, capture
 from entry import Entry
 from input_lib import EXIT_INPUT_KEY_SEQUENCE, HELP_INPUT_KEY_SEQUENCE, input_bool, input_choice, InputAbortException, InputExitException, HelpOutput
 
 
+screen = Screen()
+
+
 def clear():
     """Clears the screen
     """
-    os.system('cls' if os.name == 'nt' else 'clear')
+    screen.clear()
 
 
 def entry_display(entry:Entry, database:Database) -> bool:
     """Displays a menu to execute action on a single entry and also displays the entry to view it.
     """
     show_help = False
+    screen.invalidate()
     while True:
-        clear()
-        entry.print()
+        lines = capture(entry.print)
         if show_help:
-            print(" Options:")
-            print("   help or ?         Shows help")
-            print("   edit or e         Edits the entry")
-            print("   delete or d       Deletes the entry")
-            print("   back or b or ^X   returns to the previous screen")
-            print("   mail or m         Send an E-Mail")
-            print("   tel or t          Call a phone or mobile number")
+            lines.append(" Options:")
+            lines.append("   help or ?         Shows help")
+            lines.append("   edit or e         Edits the entry")
+            lines.append("   delete or d       Deletes the entry")
+            lines.append("   back or b or ^X   returns to the previous screen")
+            lines.append("   mail or m         Send an E-Mail")
+            lines.append("   tel or t          Call a phone or mobile number")
         else:
-            print(" Options: help, ?, edit, e, delete, d, back, b, ^X, mail, m, tel, t")
-        print("─────────────────────────────────────────────────────────────────────────")
+            lines.append(" Options: help, ?, edit, e, delete, d, back, b, ^X, mail, m, tel, t")
+        lines.append("─────────────────────────────────────────────────────────────────────────")
+        screen.render(lines)
         line = input(": ").strip().lower()
+        if line not in ["help", "?"]:
+            # Any other command might print below the frame.
+            screen.invalidate()
 
         if line in ["b", "back", EXIT_INPUT_KEY_SEQUENCE]:
             break
@@ -99,6 +118,7 @@ def entry_display(entry:Entry, database:Database) -> bool:
                 except InputExitException:
                     pass
                 entry.save()
+                database.update_entry(entry)
                 print("Entry changes saved.")
             except InputAbortException:
                 entry.reload()
@@ -109,8 +129,7 @@ def entry_display(entry:Entry, database:Database) -> bool:
             try:
                 if input_bool("Are you sure you want to permanently delete this entry?! (delete|no) ", "delete", "no"):
                     display, _ = entry.display()
-                    entry.delete_file()
-                    database.update_deleted_entries()
+                    database.delete_entry(entry)
                     print(f"Entry for \"{display}\" was deleted!")
                     input("Press ENTER to return to main menu ...")
                     return True
@@ -119,6 +138,59 @@ def entry_display(entry:Entry, database:Database) -> bool:
     return False
 
 
+def result_count(entries) -> tuple:
+    """Returns the count of entries of a list or of a SearchCursor without waiting for the cursor.
+
+    Returns:
+        (int, bool): the count known so far and True if the count is complete
+    """
+    if isinstance(entries, SearchCursor):
+        return (entries.found(), entries.is_complete())
+    return (len(entries), True)
+
+
+def render_page(entries:list[Entry], page:int, page_size:int) -> list[str]:
+    """Renders one page of the list view.
+
+    Args:
+        entries (list[Entry]): The full list of entries shown in the paged view (or a SearchCursor).
+        page (int): Index of the page to render.
+        page_size (int): Count of entries per page.
+
+    Returns:
+        list[str]: the lines of the page
+    """
+    lines = []
+    count, complete = result_count(entries)
+    page_count = int(math.ceil(count / page_size))
+    page_start_index = page * page_size
+    page_max_index = page * page_size + page_size
+    if page_max_index > count:
+        page_max_index = count
+    rows = [entries[i].list_row() for i in range(page_start_index, page_max_index)]
+    display_max_len = max([len(row[0]) for row in rows], default=0)
+    index_max_len = len(str(page_max_index))
+
+    lines.append("─────────────────────────────────────────────────────────────────────────")
+    total = f"{count}" if complete else f"{count}+ (counting ...)"
+    lines.append(
+        f" Page: {page+1} / {page_count} - Index {(page_start_index) + 1} to {page_max_index} of {total} Entries - Page size: {page_size}"
+    )
+    lines.append("─────────────────────────────────────────────────────────────────────────")
+    display = "Name"
+    display += " " * (display_max_len - len(display))
+    index = "#"
+    index = (" " * (index_max_len - len(index))) + index
+    lines.append(" [" + index + "] 👫 " + display + " 📫 Contact")
+    for i, (display, dicon, contact, cicon) in enumerate(rows, page_start_index):
+        display += " " * (display_max_len - len(display))
+        index = str(i + 1)
+        index = (" " * (index_max_len - len(index))) + index
+        lines.append(" [" + index + "] " + dicon + " " + display + " " + cicon + " " + contact)
+    lines.extend(["-"] * (page_size - len(rows)))
+    return lines
+
+
 def entry_list_view(entries:list[Entry], database:Database) -> None:
     """Displays a multipaged list of entries.
 
@@ -129,67 +201,45 @@ def entry_list_view(entries:list[Entry], database:Database) -> None:
     page = 0
     show_help = False
     while True:
-        page_count = int(math.ceil(len(entries) / page_size))
-        display_max_len = 0
-        index_max_len = 0
-
-        for i in range(page * page_size, page * page_size + page_size):
-            if i < len(entries):
-                entry = entries[i]
-                display, dicon = entry.display()
-                if len(display) > display_max_len:
-                    display_max_len = len(display)
-                if len(str(i+1)) > index_max_len:
-                    index_max_len = len(str(i+1))
-
-        clear()
-        print("─────────────────────────────────────────────────────────────────────────")
-        page_start_index = page * page_size
-        page_max_index = page * page_size + page_size
-        if page_max_index > len(entries):
-            page_max_index = len(entries)
-        print(
-            f" Page: {page+1} / {page_count} - Index {(page_start_index) + 1} to {page_max_index} of {len(entries)} Entries - Page size: {page_size}"
-        )
-        print("─────────────────────────────────────────────────────────────────────────")
-        display = "Name"
-        display += " " * (display_max_len - len(display))
-        index = "#"
-        index = (" " * (index_max_len - len(index))) + index
-        print(" [" + index + "] 👫 " + display + " 📫 Contact")
-        for i in range(page_start_index, page * page_size + page_size):
-            if i < len(entries):
-                entry = entries[i]
-                display, dicon = entry.display()
-                display += " " * (display_max_len - len(display))
-                contact, cicon = entry.get_contact()
-                index = str(i + 1)
-                index = (" " * (index_max_len - len(index))) + index
-                print(" [" + index + "] " + dicon + " " + display + " " + cicon + " " + contact)
-            else:
-                print("-")
-        print("─────────────────────────────────────────────────────────────────────────")
+        if isinstance(entries, SearchCursor):
+            # Only wait for the current and the next page, the rest gets counted in the background.
+            entries.wait((page + 2) * page_size)
+        with database.lock:
+            # The folder watcher changes the contacts in the background, so the page is rendered
+            # and its entries are picked from the same state of the list.
+            count, _ = result_count(entries)
+            page_count = int(math.ceil(count / page_size))
+            page_start_index = page * page_size
+            page_max_index = page * page_size + page_size
+            if page_max_index > count:
+                page_max_index = count
+            page_entries = [entries[i] for i in range(page_start_index, page_max_index)]
+            lines = render_page(entries, page, page_size)
+        lines.append("─────────────────────────────────────────────────────────────────────────")
         if show_help:
-            print(" [any number #]   view Entry with matching #-number")
-            print(" n                next page")
-            print(" p                previous page")
-            print(" +                enlarge page size (max 200)")
-            print(" -                shrink page size (min 5)")
-            print(" ?                display help")
-            print(" b or ^X          back to main menu")
-            print()
-            print(" n,p,+,- can be entered multiple times to make bigger steps.")
+            lines.append(" [any number #]   view Entry with matching #-number")
+            lines.append(" n                next page")
+            lines.append(" p                previous page")
+            lines.append(" +                enlarge page size (max 200)")
+            lines.append(" -                shrink page size (min 5)")
+            lines.append(" ?                display help")
+            lines.append(" b or ^X          back to main menu")
+            lines.append("")
+            lines.append(" n,p,+,- can be entered multiple times to make bigger steps.")
             show_help = False
         else:
-            print(" Options: #, p, n, b, +, -, ?, ^X")
-        print("─────────────────────────────────────────────────────────────────────────")
+            lines.append(" Options: #, p, n, b, +, -, ?, ^X")
+        lines.append("─────────────────────────────────────────────────────────────────────────")
+        screen.render(lines)
         line = input(": ").strip().lower()
         if line.isnumeric():
             i = int(line)
             i -= 1
             if page_start_index <= i < page_max_index:
-                entry = entries[i]
-                if entry_display(entry, database):
+                entry = page_entries[i - page_start_index]
+                done = entry_display(entry, database)
+                screen.invalidate()
+                if done:
                     break
         elif line == "?":
             show_help = True
@@ -212,7 +262,7 @@ def entry_list_view(entries:list[Entry], database:Database) -> None:
                 for char in line:
                     if char == "-" and page_size > 5:
                         page_size -= 1
-        page_count = int(math.ceil(len(entries) / page_size))
+        page_count = int(math.ceil(result_count(entries)[0] / page_size))
         if page < 0:
             page = 0
         if page >= page_count:
@@ -237,7 +287,9 @@ def display_help(adv = False) -> None:
         print("                                    - \"add:\"   search by address text fields.")
         print("                                    - \"#add:\"  search by address including numbers")
         print("                                    - \"@:\"     search by e-mail.")
+        print("                                      (\"@:name@\" and \"@:@domain.com\" search by name or domain.)")
         print("                                    - \"#:\"     search by phone/mobile number.")
+        print("                                      (spaces, dashes and other formatting are ignored.)")
         print("                                      (If no prefix is given search will only look by name)")
 
 
@@ -260,6 +312,8 @@ def main() -> None:
     clear()
     print_title()
     database = Database()
+    if path_config.WATCH_FOLDER:
+        FolderWatcher(database).start()
     #database.generate_random_entries()
     print()
     display_help()
@@ -302,23 +356,75 @@ def main() -> None:
             show_help = True
 
         elif line.strip() == "*":
-            if len(database.contacts) > 1:
+            with database.lock:
+                count = len(database.contacts)
+                first = database.contacts[0] if count == 1 else None
+            if count > 1:
                 entry_list_view(database.contacts, database)
-            elif len(database.contacts) == 1:
-                entry_display(database.contacts[0], database)
+            elif first is not None:
+                entry_display(first, database)
             else:
                 print("\nCurrently your phonebook is empty 🤷‍♂️ ...\n")
                 input("Press ENTER to continue ...")
 
         elif line.strip() != "":
-            search_result = database.search(line)
-            if len(search_result) > 1:
+            search_result = database.search_lazy(line)
+            if search_result.at_least(2):
                 entry_list_view(search_result, database)
-            elif len(search_result) == 1:
+            elif search_result.at_least(1):
                 entry_display(search_result[0], database)
             else:
                 print("\nNo results ...\n")
                 input("Press ENTER to continue ...")
+            search_result.close()
+
+def query(database:Database, search_str:str, file_format:str = "json", limit:int = None, output = None) -> int:
+    """Writes the result of a search without any user interaction.
+
+    Args:
+        database (Database): the database to search.
+        search_str (str): the search, using the same prefixes as the interactive search ("*" lists all entries).
+        file_format (str, optional): "json", "jsonl", "csv" or "vcard" (see exporter.FORMATS). Defaults to "json".
+        limit (int, optional): maximum count of entries to write. Defaults to all.
+        output (file, optional): the file to write to. Defaults to sys.stdout.
+
+    Returns:
+        int: count of written entries
+    """
+    if search_str.strip() == "*":
+        entries = database.contacts[:limit]
+    else:
+        # The search stops as soon as the limit is reached.
+        cursor = database.search_lazy(search_str)
+        entries = cursor[:limit]
+        cursor.close()
+    return exporter.export(entries, output if output is not None else sys.stdout, file_format)
+
+
+def run_command(args:list[str]) -> int:
+    """Runs a command given on the command line instead of the interactive phonebook.
+
+    Args:
+        args (list[str]): the command line arguments (without the script name).
+
+    Returns:
+        int: the exit code, 0 if entries were found, 1 if not
+    """
+    parser = argparse.ArgumentParser(description="Phonebook commands for scripts. Start without arguments for the interactive phonebook.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    query_parser = commands.add_parser("query", help="writes the result of a search to stdout")
+    query_parser.add_argument("search", help="the search, using the prefixes of the interactive search (\"*\" for all)")
+    query_parser.add_argument("--format", choices=list(exporter.FORMATS), default="json", help="output format (default: json)")
+    query_parser.add_argument("--limit", type=exporter.parse_limit, default=None, help="maximum count of results (0 for all)")
+    arguments = parser.parse_args(args)
+    # Messages of the database would corrupt the output, the startup index keeps loading fast.
+    with contextlib.redirect_stdout(sys.stderr):
+        database = Database(use_index=True)
+    count = query(database, arguments.search, arguments.format, arguments.limit)
+    return 0 if count > 0 else 1
+
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_command(sys.argv[1:]))
     main()
@@ -0,0 +1,221 @@
+"""Contains a storage backend keeping all entries of the phonebook inside one pack file.
+
+The pack file is an append only log. Every line holds the key of an entry followed by
+a tab and either the JSON data of the entry or a single "-" marking the entry as deleted.
+The last line of a key wins. Compacting the pack rewrites all live records into a fresh file.
+"""
+
+import os
+import json
+import threading
+from os.path import exists, isfile, join
+
+import path_config
+
+
+DELETED_MARKER = b"-"
+
+
+class PackStorage:
+    """Storage backend keeping all entries in one append only pack file.
+    Can be used from multiple threads.
+    """
+
+    def __init__(self, path:str, compact_ratio:float = 1.0) -> None:
+        """Opens or creates a pack file.
+
+        Args:
+            path (str): Path of the pack file.
+            compact_ratio (float, optional): The pack gets compacted on opening once it holds more
+                                             outdated records than this ratio of live records. Defaults to 1.0.
+        """
+        self.path = path
+        self.compact_ratio = compact_ratio
+        self._offsets = {}
+        self._dead = 0
+        # Every seek of the shared file handle and the following read or write happen under this lock.
+        self._lock = threading.Lock()
+        if not exists(path):
+            with open(path, "wb"):
+                pass
+        self._scan()
+        self._file = open(path, "ab+")
+        if self._dead > 0 and self._dead > len(self._offsets) * compact_ratio:
+            self.compact()
+
+    def _scan(self) -> None:
+        """Reads the offsets of all live records from the pack file.
+        A truncated last line (e.g. after a crash) will be ignored and cut off.
+        """
+        self._offsets = {}
+        self._dead = 0
+        valid_end = 0
+        with open(self.path, "rb") as pack:
+            offset = 0
+            for line in pack:
+                if not line.endswith(b"\n"):
+                    break
+                key, _, data = line.rstrip(b"\n").partition(b"\t")
+                key = key.decode("utf-8")
+                if key in self._offsets:
+                    self._dead += 1
+                if data == DELETED_MARKER:
+                    if key in self._offsets:
+                        del self._offsets[key]
+                    self._dead += 1
+                else:
+                    self._offsets[key] = (offset + len(key.encode("utf-8")) + 1, len(data))
+                offset += len(line)
+                valid_end = offset
+        if valid_end < os.path.getsize(self.path):
+            with open(self.path, "rb+") as pack:
+                pack.truncate(valid_end)
+
+    def _append(self, key:str, data:bytes) -> None:
+        with self._lock:
+            self._append_locked(key, data)
+
+    def _append_locked(self, key:str, data:bytes) -> None:
+        self._file.seek(0, os.SEEK_END)
+        offset = self._file.tell()
+        prefix = key.encode("utf-8") + b"\t"
+        self._file.write(prefix + data + b"\n")
+        self._file.flush()
+        if key in self._offsets:
+            self._dead += 1
+        if data == DELETED_MARKER:
+            self._offsets.pop(key, None)
+            self._dead += 1
+        else:
+            self._offsets[key] = (offset + len(prefix), len(data))
+
+    def keys(self) -> list[str]:
+        """Returns the keys of all live entries.
+        """
+        return list(self._offsets.keys())
+
+    def exists(self, key:str) -> bool:
+        """Checks if a live record for the given key exists.
+        """
+        return key in self._offsets
+
+    def get(self, key:str) -> dict:
+        """Returns the data of an entry or None if no live record exists.
+        """
+        with self._lock:
+            if key not in self._offsets:
+                return None
+            offset, length = self._offsets[key]
+            self._file.seek(offset)
+            data = self._file.read(length)
+        return json.loads(data)
+
+    def put(self, key:str, record:dict) -> None:
+        """Appends a new version of an entry.
+        """
+        self._append(key, json.dumps(record).encode("utf-8"))
+
+    def delete(self, key:str) -> None:
+        """Appends a deletion marker for an entry.
+        """
+        if key in self._offsets:
+            self._append(key, DELETED_MARKER)
+
+    def load_all(self):
+        """Reads all live records in the order they are stored inside the pack.
+
+        Yields:
+            tuple: The key and the data of each live entry.
+        """
+        with self._lock:
+            keys = [key for key, _ in sorted(self._offsets.items(), key=lambda item: item[1][0])]
+        for key in keys:
+            with self._lock:
+                # The offsets change if the pack got compacted in the meantime.
+                if key not in self._offsets:
+                    continue
+                offset, length = self._offsets[key]
+                self._file.seek(offset)
+                data = self._file.read(length)
+            yield (key, json.loads(data))
+
+    def compact(self) -> None:
+        """Rewrites all live records into a fresh pack file and drops all outdated ones.
+        """
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self) -> None:
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as temp:
+            for key, (offset, length) in sorted(self._offsets.items(), key=lambda item: item[1][0]):
+                self._file.seek(offset)
+                temp.write(key.encode("utf-8") + b"\t" + self._file.read(length) + b"\n")
+            temp.flush()
+            os.fsync(temp.fileno())
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._scan()
+        self._file = open(self.path, "ab+")
+
+    def close(self) -> None:
+        """Closes the pack file.
+        """
+        with self._lock:
+            self._file.close()
+
+
+def migrate_folder(folder:str, pack_path:str, remove_files:bool = False) -> int:
+    """Copies all entry files of a folder into a pack file.
+
+    Args:
+        folder (str): The folder containing the entry files.
+        pack_path (str): Path of the pack file.
+        remove_files (bool, optional): Set to True to delete the entry files after they where copied. Defaults to False.
+
+    Returns:
+        int: count of migrated entries
+    """
+    storage = PackStorage(pack_path)
+    count = 0
+    for file in os.listdir(folder):
+        path = join(folder, file)
+        if isfile(path) and file.lower().endswith(path_config.FILE_EXTENSINON):
+            try:
+                with open(path, "r", encoding="utf-8") as iofile:
+                    storage.put(file, json.load(iofile))
+            except (PermissionError, ValueError) as ex:
+                print(f"{file}: {ex}")
+                continue
+            count += 1
+    storage.compact()
+    keys = storage.keys()
+    storage.close()
+    if remove_files:
+        for key in keys:
+            path = join(folder, key)
+            if isfile(path):
+                os.remove(path)
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    def main():
+        """Command line tool to migrate the phonebook folder into a pack file or to compact a pack file.
+        """
+        parser = argparse.ArgumentParser(description="Manage the phonebook pack file.")
+        parser.add_argument("command", choices=["migrate", "compact"])
+        parser.add_argument("--remove", action="store_true", help="delete the entry files after migrating them")
+        args = parser.parse_args()
+        if args.command == "migrate":
+            count = migrate_folder(path_config.get_folder_path(), path_config.get_pack_path(), args.remove)
+            print(f"Migrated {count} entries into {path_config.get_pack_path()}")
+            print("Set STORAGE_BACKEND = \"pack\" inside path_config.py to use the pack file.")
+        else:
+            storage = PackStorage(path_config.get_pack_path())
+            storage.compact()
+            storage.close()
+            print(f"Compacted {path_config.get_pack_path()}")
+    main()
@@ -1,11 +1,29 @@
 """Contains const values
 """
 
+import os
 import uuid
 from os.path import expanduser, join
 
 FOLDER_NAME = "phonebook"
 FILE_EXTENSINON = ".jcontact"
+LOAD_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+LOAD_USE_PROCESSES = False
+STORAGE_BACKEND = "files" # "files", "pack" or "sqlite"
+PACK_FILE_NAME = "contacts.jpack"
+SQLITE_FILE_NAME = "contacts.sqlite"
+USE_STARTUP_INDEX = True
+LAZY_ENTRIES = False
+LAZY_CACHE_SIZE = 1000
+COLUMNAR_STORE = False
+WATCH_FOLDER = True
+WATCH_INTERVAL = 2.0
+WATCH_FULL_SCAN_INTERVAL = 30.0
+INDEX_FILE_NAME = "index.json"
+SNAPSHOT_FILE_NAME = "snapshot.pbsnap"
+SERVER_PORT = 8765
+SERVER_MAX_PENDING = 64
+SERVER_KEEP_ALIVE_TIMEOUT = 15.0
 
 def get_folder_path() -> str:
     """Returns the path to the phonebook folder.
@@ -35,3 +53,35 @@ def new_file_name() -> str:
         _type_: the full path to a new file.
     """
     return get_path(str(uuid.uuid4()))
+
+def get_pack_path() -> str:
+    """Returns the path to the pack file used by the pack storage backend.
+
+    Returns:
+        str: full path.
+    """
+    return join(get_folder_path(), PACK_FILE_NAME)
+
+def get_sqlite_path() -> str:
+    """Returns the path to the database file used by the sqlite storage backend.
+
+    Returns:
+        str: full path.
+    """
+    return join(get_folder_path(), SQLITE_FILE_NAME)
+
+def get_index_path() -> str:
+    """Returns the path to the startup index inside the phonebook folder.
+
+    Returns:
+        str: full path.
+    """
+    return join(get_folder_path(), INDEX_FILE_NAME)
+
+def get_snapshot_path() -> str:
+    """Returns the path to the read only snapshot shared by reader processes.
+
+    Returns:
+        str: full path.
+    """
+    return join(get_folder_path(), SNAPSHOT_FILE_NAME)
@@ -0,0 +1,115 @@
+"""Contains a buffered terminal renderer only repainting the lines that changed.
+"""
+
+import io
+import os
+import sys
+import shutil
+import contextlib
+
+
+CLEAR_SCREEN = "\x1b[H\x1b[2J"
+CLEAR_LINE = "\x1b[K"
+CLEAR_BELOW = "\x1b[J"
+
+
+def enable_ansi() -> None:
+    """Enables the processing of escape sequences inside the Windows console (does nothing on other systems).
+    """
+    if os.name != "nt":
+        return
+    try:
+        import ctypes # pylint: disable=import-outside-toplevel
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.GetStdHandle(-11)
+        mode = ctypes.c_uint32()
+        if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+            kernel32.SetConsoleMode(handle, mode.value | 0x0004)
+    except (AttributeError, OSError):
+        pass
+
+
+def move_to(row:int) -> str:
+    """Returns the escape sequence moving the cursor to the start of a row (starting at 0).
+    """
+    return f"\x1b[{row + 1};1H"
+
+
+def capture(function) -> list[str]:
+    """Calls a function and returns everything it printed as a list of lines.
+    """
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        function()
+    return buffer.getvalue().splitlines()
+
+
+class Screen:
+    """Renders whole screens from a list of lines.
+
+    Every frame is written with a single write call. If the previous frame is still on screen only
+    the lines that changed are repainted, everything else is sent to the terminal as is. Once the
+    frame was drawn the cursor is placed below it, so an input prompt can follow.
+    """
+
+    def __init__(self, stream = None) -> None:
+        """Creates the renderer.
+
+        Args:
+            stream (file, optional): the terminal to write to. Defaults to sys.stdout.
+        """
+        self.stream = stream
+        self._lines = None
+        enable_ansi()
+
+    def _stream(self):
+        return self.stream if self.stream is not None else sys.stdout
+
+    def is_terminal(self) -> bool:
+        """Returns True if the output is a terminal supporting escape sequences.
+        """
+        try:
+            return self._stream().isatty()
+        except (AttributeError, ValueError):
+            return False
+
+    def invalidate(self) -> None:
+        """Forgets the previous frame, so the next frame repaints the whole screen.
+        Call it after something else was printed.
+        """
+        self._lines = None
+
+    def clear(self) -> None:
+        """Clears the screen.
+        """
+        if self.is_terminal():
+            self._stream().write(CLEAR_SCREEN)
+            self._stream().flush()
+        self._lines = None
+
+    def render(self, lines:list[str]) -> None:
+        """Draws a frame.
+
+        Args:
+            lines (list[str]): the lines of the frame
+        """
+        stream = self._stream()
+        if not self.is_terminal():
+            stream.write("\n".join(lines) + "\n")
+            stream.flush()
+            return
+        rows = shutil.get_terminal_size().lines
+        previous = self._lines
+        if previous is None or len(lines) >= rows or len(previous) >= rows:
+            # A frame higher than the terminal scrolls, so its lines can not be addressed anymore.
+            out = CLEAR_SCREEN + "\n".join(lines) + "\n"
+        else:
+            parts = []
+            for row, line in enumerate(lines):
+                if row >= len(previous) or previous[row] != line:
+                    parts.append(move_to(row) + line + CLEAR_LINE)
+            parts.append(move_to(len(lines)) + CLEAR_BELOW)
+            out = "".join(parts)
+        stream.write(out)
+        stream.flush()
+        self._lines = list(lines)
@@ -0,0 +1,114 @@
+"""Contains a lazy search result filled by a background thread.
+"""
+
+import threading
+from array import array
+
+
+CHUNK_SIZE = 500
+
+
+class SearchCursor:
+    """Sorted search result that is filled in the background while the first rows are already in use.
+
+    A background thread runs the predicate over a sorted source and records the positions of the
+    matches. Accessing a row only waits until the thread reached it, so the first page of a broad
+    search is available long before all entries were checked. len() waits for the full count,
+    use found() and is_complete() to show the progress instead.
+    """
+
+    def __init__(self, source, predicate = None, chunk_size:int = CHUNK_SIZE) -> None:
+        """Creates the cursor and starts the search.
+
+        Args:
+            source (sequence): the sorted entries to search. Needs to support len() and indexing.
+            predicate (callable, optional): Function returning True for matching entries.
+                                            If None every entry of the source matches.
+            chunk_size (int, optional): count of entries checked between two notifications. Defaults to CHUNK_SIZE.
+        """
+        self.source = source
+        self.predicate = predicate
+        self.chunk_size = chunk_size
+        self._condition = threading.Condition()
+        self._positions = array("I")
+        self._closed = False
+        self._complete = predicate is None
+        if not self._complete:
+            threading.Thread(target=self._run, name="SearchCursor", daemon=True).start()
+
+    def _run(self) -> None:
+        predicate = self.predicate
+        count = len(self.source)
+        for start in range(0, count, self.chunk_size):
+            if self._closed:
+                break
+            found = [i for i in range(start, min(count, start + self.chunk_size)) if predicate(self.source[i])]
+            with self._condition:
+                self._positions.extend(found)
+                self._condition.notify_all()
+        with self._condition:
+            self._complete = True
+            self._condition.notify_all()
+
+    def found(self) -> int:
+        """Returns the count of matches found so far.
+        """
+        if self.predicate is None:
+            return len(self.source)
+        return len(self._positions)
+
+    def is_complete(self) -> bool:
+        """Returns True once all entries where checked.
+        """
+        return self._complete
+
+    def wait(self, count:int = None) -> None:
+        """Blocks until the given count of matches was found or the search is complete.
+
+        Args:
+            count (int, optional): count of matches to wait for. Defaults to all.
+        """
+        with self._condition:
+            while not self._complete and (count is None or self.found() < count):
+                self._condition.wait()
+
+    def at_least(self, count:int) -> bool:
+        """Returns True if the search has at least the given count of matches.
+        Only waits until that many where found.
+        """
+        self.wait(count)
+        return self.found() >= count
+
+    def close(self) -> None:
+        """Stops the background search. The matches found so far stay accessible.
+        """
+        self._closed = True
+
+    def __len__(self) -> int:
+        self.wait()
+        return self.found()
+
+    def _entry(self, index:int):
+        if self.predicate is None:
+            return self.source[index]
+        return self.source[self._positions[index]]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            if index.stop is None or index.stop < 0 or (index.start or 0) < 0:
+                self.wait()
+            else:
+                self.wait(index.stop)
+            return [self._entry(i) for i in range(*index.indices(self.found()))]
+        if index < 0:
+            index += len(self)
+        self.wait(index + 1)
+        if not 0 <= index < self.found():
+            raise IndexError("SearchCursor index out of range")
+        return self._entry(index)
+
+    def __iter__(self):
+        index = 0
+        while self.at_least(index + 1):
+            yield self._entry(index)
+            index += 1
@@ -0,0 +1,385 @@
+"""Contains indexes used to speed up the search inside a phonebook.
+"""
+
+from bisect import bisect_left, insort
+
+from entry import Entry, SEARCH_SCOPES, split_search, normalize_phone
+
+
+MIN_CALLER_DIGITS = 6
+
+
+def trigrams(text:str) -> set:
+    """Returns all substrings of length 3 of a text.
+    """
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """Inverted index mapping each trigram of the searchable fields to the entries containing it.
+    One index is kept per group of fields (see entry.SEARCH_SCOPES). A group is only indexed
+    once it is searched for the first time.
+    """
+
+    def __init__(self, entries:list[Entry]) -> None:
+        """Creates the index for a list of entries.
+
+        Args:
+            entries (list[Entry]): All entries of the phonebook. The list is kept to build groups on demand.
+        """
+        self.entries = entries
+        self._postings = {}
+        self._grams = {}
+
+    def _build(self, group:str) -> None:
+        self._postings[group] = {}
+        self._grams[group] = {}
+        for entry in self.entries:
+            self._add_group(group, entry)
+
+    def _add_group(self, group:str, entry:Entry) -> None:
+        grams = set()
+        for value in entry.search_fields(group):
+            grams.update(trigrams(value))
+        postings = self._postings[group]
+        for gram in grams:
+            if gram in postings:
+                postings[gram].add(entry)
+            else:
+                postings[gram] = {entry}
+        self._grams[group][entry] = grams
+
+    def _remove_group(self, group:str, entry:Entry) -> None:
+        grams = self._grams[group].pop(entry, None)
+        if grams is None:
+            return
+        postings = self._postings[group]
+        for gram in grams:
+            posting = postings.get(gram)
+            if posting is not None:
+                posting.discard(entry)
+                if not posting:
+                    del postings[gram]
+
+    def add(self, entry:Entry) -> None:
+        """Adds an entry to all groups built so far.
+        """
+        for group in self._postings:
+            self._add_group(group, entry)
+
+    def add_many(self, entries:list[Entry]) -> None:
+        """Adds multiple entries to all groups built so far.
+        """
+        for entry in entries:
+            self.add(entry)
+
+    def remove(self, entry:Entry) -> None:
+        """Removes an entry from all groups.
+        """
+        for group in self._postings:
+            self._remove_group(group, entry)
+
+    def update(self, entry:Entry) -> None:
+        """Reindexes an entry after its data changed.
+        """
+        for group in self._postings:
+            self._remove_group(group, entry)
+            self._add_group(group, entry)
+
+    def candidates(self, search_str:str) -> set:
+        """Returns a set of entries that might match the search string.
+        Every matching entry is part of the set, but the set may contain entries not matching it.
+
+        Args:
+            search_str (str): A string to search possible flags: "all:", "#all:", "org:", "add:", "#add:", "#:", "@:"
+
+        Returns:
+            set: candidate entries or None if the search text is to short to use the index
+        """
+        prefix, text = split_search(search_str)
+        query = trigrams(text)
+        if not query:
+            return None
+        result = set()
+        for group in SEARCH_SCOPES[prefix]:
+            if group not in self._postings:
+                self._build(group)
+            postings = self._postings[group]
+            sets = []
+            for gram in query:
+                posting = postings.get(gram)
+                if posting is None:
+                    sets = None
+                    break
+                sets.append(posting)
+            if sets is None:
+                continue
+            sets.sort(key=len)
+            result |= sets[0].intersection(*sets[1:])
+        return result
+
+
+class SortedKeyIndex:
+    """Base class of indexes keeping string keys of each entry in sorted lists,
+    so all entries with a key starting with a given prefix can be found by a binary search.
+    The index gets built on first use.
+    """
+
+    key_lists = ()
+    """Names of the sorted key lists of the index."""
+
+    def __init__(self, entries:list[Entry]) -> None:
+        """Creates the index for a list of entries.
+
+        Args:
+            entries (list[Entry]): All entries of the phonebook. The list is kept to build the index on demand.
+        """
+        self.entries = entries
+        self._built = False
+        self._ids = {}
+        self._by_id = {}
+        self._next_id = 0
+        self._lists = {name: [] for name in self.key_lists}
+
+    def _keys(self, entry:Entry) -> dict:
+        """Returns the set of keys of an entry for each key list.
+        Additional sets used by _on_add and _on_remove may be returned as well.
+        """
+        raise NotImplementedError()
+
+    def _on_add(self, entry_id:int, keys:dict) -> None:
+        """Called once the keys of an entry where added.
+        """
+
+    def _on_remove(self, entry_id:int, keys:dict) -> None:
+        """Called once the keys of an entry where removed.
+        """
+
+    def _build(self) -> None:
+        self._built = True
+        for entry in self.entries:
+            self._add(entry, False)
+        for keys in self._lists.values():
+            keys.sort()
+
+    def _add(self, entry:Entry, keep_sorted:bool = True) -> None:
+        entry_id = self._next_id
+        self._next_id += 1
+        keys = self._keys(entry)
+        self._ids[entry] = (entry_id, keys)
+        self._by_id[entry_id] = entry
+        add = insort if keep_sorted else list.append
+        for name in self.key_lists:
+            for value in keys[name]:
+                add(self._lists[name], (value, entry_id))
+        self._on_add(entry_id, keys)
+
+    def _remove(self, entry:Entry) -> None:
+        entry_id, keys = self._ids.pop(entry, (None, None))
+        if entry_id is None:
+            return
+        del self._by_id[entry_id]
+        for name in self.key_lists:
+            sorted_keys = self._lists[name]
+            for value in keys[name]:
+                index = bisect_left(sorted_keys, (value, entry_id))
+                if index < len(sorted_keys) and sorted_keys[index] == (value, entry_id):
+                    del sorted_keys[index]
+        self._on_remove(entry_id, keys)
+
+    def ensure_built(self) -> None:
+        """Builds the index if it was not used so far.
+        """
+        if not self._built:
+            self._build()
+
+    def add(self, entry:Entry) -> None:
+        """Adds an entry to the index.
+        """
+        if self._built:
+            self._add(entry)
+
+    def add_many(self, entries:list[Entry]) -> None:
+        """Adds multiple entries and sorts the key lists a single time.
+        """
+        if self._built:
+            for entry in entries:
+                self._add(entry, False)
+            for keys in self._lists.values():
+                keys.sort()
+
+    def remove(self, entry:Entry) -> None:
+        """Removes an entry from the index.
+        """
+        if self._built:
+            self._remove(entry)
+
+    def update(self, entry:Entry) -> None:
+        """Reindexes an entry after its data changed.
+        """
+        if self._built:
+            self._remove(entry)
+            self._add(entry)
+
+    def _range(self, name:str, prefix:str) -> set:
+        self.ensure_built()
+        sorted_keys = self._lists[name]
+        result = set()
+        index = bisect_left(sorted_keys, (prefix,))
+        while index < len(sorted_keys) and sorted_keys[index][0].startswith(prefix):
+            result.add(self._by_id[sorted_keys[index][1]])
+            index += 1
+        return result
+
+
+class PhoneIndex(SortedKeyIndex):
+    """Index of the phone, mobile and fax numbers of all entries normalized to their digits.
+    All suffixes of each number are kept in a sorted list, so prefix and substring lookups
+    only need a binary search.
+    """
+
+    key_lists = ("numbers", "suffixes")
+
+    def __init__(self, entries:list[Entry]) -> None:
+        super().__init__(entries)
+        self._national = {}
+
+    def _keys(self, entry:Entry) -> dict:
+        numbers = {number for number in entry.search_fields("phone_digits") if number != ""}
+        return {
+            "numbers": numbers,
+            "suffixes": {number[i:] for number in numbers for i in range(len(number))}
+        }
+
+    def _on_add(self, entry_id:int, keys:dict) -> None:
+        for number in keys["numbers"]:
+            self._national.setdefault(number.lstrip("0"), set()).add(entry_id)
+
+    def _on_remove(self, entry_id:int, keys:dict) -> None:
+        for number in keys["numbers"]:
+            national = self._national.get(number.lstrip("0"))
+            if national is not None:
+                national.discard(entry_id)
+                if not national:
+                    del self._national[number.lstrip("0")]
+
+    def starting_with(self, number:str) -> set:
+        """Returns all entries having a number starting with the digits of the given number.
+        """
+        return self._range("numbers", normalize_phone(number))
+
+    def containing(self, number:str) -> set:
+        """Returns all entries having a number containing the digits of the given number.
+        """
+        return self._range("suffixes", normalize_phone(number))
+
+    def lookup_caller(self, number:str) -> set:
+        """Returns the entries of an incoming call.
+        Numbers match exactly, ignoring their formatting, or if the stored number without leading zeros
+        is the end of the calling number (e.g. "+49 176 1234567" matches a stored "0176 1234567").
+
+        Args:
+            number (str): the calling number
+
+        Returns:
+            set: the matching entries
+        """
+        self.ensure_built()
+        digits = normalize_phone(number)
+        if digits == "":
+            return set()
+        exact = {entry for entry in self._range("numbers", digits) if digits in self._ids[entry][1]["numbers"]}
+        if exact:
+            return exact
+        digits = digits.lstrip("0")
+        for i in range(len(digits) - MIN_CALLER_DIGITS + 1):
+            national = self._national.get(digits[i:])
+            if national:
+                return {self._by_id[entry_id] for entry_id in national}
+        return set()
+
+
+def reversed_domain(domain:str) -> str:
+    """Returns the labels of a domain in reversed order followed by a dot (e.g. "com.example.mail.").
+    Thereby a domain and all of its subdomains share the same prefix.
+    """
+    return ".".join(reversed(domain.split("."))) + "."
+
+
+class EmailIndex(SortedKeyIndex):
+    """Index of all e-mail addresses keyed by their reversed domain and by their local part.
+    """
+
+    key_lists = ("domains",)
+
+    def __init__(self, entries:list[Entry]) -> None:
+        super().__init__(entries)
+        self._locals = {}
+        self._domain_counts = {}
+
+    def _keys(self, entry:Entry) -> dict:
+        domains = set()
+        locals_ = set()
+        for email in entry.search_fields("email"):
+            local, at_sign, domain = email.rpartition("@")
+            if at_sign != "":
+                domains.add(reversed_domain(domain))
+                locals_.add(local)
+        return {"domains": domains, "locals": locals_}
+
+    def _on_add(self, entry_id:int, keys:dict) -> None:
+        for local in keys["locals"]:
+            self._locals.setdefault(local, set()).add(entry_id)
+        for domain in keys["domains"]:
+            self._domain_counts[domain] = self._domain_counts.get(domain, 0) + 1
+
+    def _on_remove(self, entry_id:int, keys:dict) -> None:
+        for local in keys["locals"]:
+            ids = self._locals.get(local)
+            if ids is not None:
+                ids.discard(entry_id)
+                if not ids:
+                    del self._locals[local]
+        for domain in keys["domains"]:
+            self._domain_counts[domain] -= 1
+            if self._domain_counts[domain] <= 0:
+                del self._domain_counts[domain]
+
+    def by_domain(self, domain:str, subdomains:bool = True) -> set:
+        """Returns all entries having an e-mail address of the given domain.
+
+        Args:
+            domain (str): the domain (e.g. "example.com")
+            subdomains (bool, optional): Set to False to exclude addresses of subdomains. Defaults to True.
+        """
+        key = reversed_domain(domain.lower())
+        result = self._range("domains", key)
+        if not subdomains:
+            result = {entry for entry in result if key in self._ids[entry][1]["domains"]}
+        return result
+
+    def by_local_part(self, local:str) -> set:
+        """Returns all entries having an e-mail address with the given local part (the part in front of the "@").
+        """
+        self.ensure_built()
+        return {self._by_id[entry_id] for entry_id in self._locals.get(local.lower(), ())}
+
+    def search(self, search_str:str) -> set:
+        """Returns all entries with an e-mail address of the local part and/or domain of a search text containing an "@".
+        Addresses only containing the search text (see entry.email_matches) are not part of the result.
+        """
+        local, _, domain = search_str.lower().rpartition("@")
+        if domain != "":
+            result = self.by_domain(domain)
+            if local != "":
+                result &= self.by_local_part(local)
+            return result
+        if local != "":
+            return self.by_local_part(local)
+        return self._range("domains", "")
+
+    def domain_counts(self) -> dict:
+        """Returns the count of entries per e-mail domain.
+        """
+        self.ensure_built()
+        return {".".join(reversed(key[:-1].split("."))): count for key, count in self._domain_counts.items()}
@@ -0,0 +1,464 @@
+"""Contains a local HTTP/JSON server holding one Database in memory for other processes.
+
+The server only listens on the loopback interface or on a Unix socket. Connections are kept
+alive between requests. The database work of a request runs inside a thread pool while the
+event loop keeps accepting and parsing requests. Once SERVER_MAX_PENDING requests are being
+processed, further requests are answered with 503 right away instead of queueing up.
+
+Endpoints:
+    GET    /contacts?q=SEARCH&limit=N&offset=N  search using the prefixes of the interactive search
+    GET    /contacts/ID                         returns a contact
+    POST   /contacts                            creates a contact, returns it with its ID
+    PUT    /contacts/ID                         replaces a contact
+    PATCH  /contacts/ID                         changes some fields of a contact
+    DELETE /contacts/ID                         deletes a contact
+    GET    /status                              count of contacts and pending requests
+
+Contacts are sent as the JSON objects of the exporter (see exporter.json_record). Missing fields
+keep their current (or empty) values.
+
+Usage:
+    python server.py [--port N | --unix PATH] [--max-pending N] [--workers N]
+"""
+
+import json
+import asyncio
+import http.client
+import socket
+from http import HTTPStatus
+from os.path import basename, join
+from urllib.parse import urlsplit, parse_qs, quote
+from concurrent.futures import ThreadPoolExecutor
+
+import path_config
+from entry import Entry, FIELD_PATHS
+from exporter import json_record
+from importer import validate
+
+
+HOST = "127.0.0.1"
+MAX_HEADER_SIZE = 64 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+DEFAULT_LIMIT = 100
+
+
+class HttpError(Exception):
+    """Gets thrown to answer a request with an error status.
+    """
+    def __init__(self, status:int, message:str = None) -> None:
+        super().__init__(message or HTTPStatus(status).phrase)
+        self.status = status
+        self.message = message or HTTPStatus(status).phrase
+
+
+def merge(target:dict, changes:dict) -> dict:
+    """Writes the values of changes into target, nested objects get merged instead of replaced.
+    """
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            merge(target[key], value)
+        else:
+            target[key] = value
+    return target
+
+
+def type_errors(data:dict, template:dict, prefix:str = "") -> list[str]:
+    """Compares the types of contact data with the data of an empty entry.
+
+    Returns:
+        list[str]: a description of every value of the wrong type
+    """
+    errors = []
+    for key, expected in template.items():
+        value = data.get(key)
+        path = prefix + key
+        if isinstance(expected, dict):
+            if isinstance(value, dict):
+                errors.extend(type_errors(value, expected, path + "."))
+            else:
+                errors.append(f"{path} has to be an object")
+        elif path == "personals.birthday":
+            if not (isinstance(value, list) and len(value) == 3 and all(type(part) is int for part in value)):
+                errors.append(f"{path} has to be [year, month, day]")
+        elif path == "notes":
+            if not (isinstance(value, list) and all(isinstance(line, str) for line in value)):
+                errors.append(f"{path} has to be a list of strings")
+        elif type(value) is not type(expected):
+            errors.append(f"{path} has to be a {type(expected).__name__}")
+    return errors
+
+
+def _int_param(params:dict, name:str, default:int) -> int:
+    try:
+        value = int(params.get(name, [default])[0])
+    except ValueError as ex:
+        raise HttpError(400, f"{name} has to be a number") from ex
+    if value < 0:
+        raise HttpError(400, f"{name} can not be negative")
+    return value
+
+
+class PhonebookServer:
+    """Serves the entries of a database as JSON over HTTP.
+    """
+
+    def __init__(self, database, max_pending:int = None, workers:int = None, keep_alive_timeout:float = None) -> None:
+        """Creates the server.
+
+        Args:
+            database (Database): the database to serve.
+            max_pending (int, optional): count of requests processed at the same time before
+                                         new ones get rejected. Defaults to path_config.SERVER_MAX_PENDING.
+            workers (int, optional): count of threads doing the database work. Defaults to 4.
+            keep_alive_timeout (float, optional): Seconds an idle connection is kept open.
+                                                  Defaults to path_config.SERVER_KEEP_ALIVE_TIMEOUT.
+        """
+        self.database = database
+        self.max_pending = max_pending if max_pending is not None else path_config.SERVER_MAX_PENDING
+        self.keep_alive_timeout = (
+            keep_alive_timeout if keep_alive_timeout is not None else path_config.SERVER_KEEP_ALIVE_TIMEOUT
+        )
+        self.executor = ThreadPoolExecutor(max_workers=workers or 4, thread_name_prefix="PhonebookServer")
+        self.pending = 0
+        self.server = None
+
+    async def start(self, port:int = None, unix:str = None):
+        """Starts listening on the loopback interface or on a Unix socket.
+
+        Args:
+            port (int, optional): the TCP port. Defaults to path_config.SERVER_PORT.
+            unix (str, optional): path of a Unix socket to listen on instead of a port.
+
+        Returns:
+            asyncio.Server: the listening server
+        """
+        if unix is not None:
+            self.server = await asyncio.start_unix_server(self.handle_connection, unix, limit=MAX_HEADER_SIZE)
+        else:
+            port = port if port is not None else path_config.SERVER_PORT
+            self.server = await asyncio.start_server(self.handle_connection, HOST, port, limit=MAX_HEADER_SIZE)
+        return self.server
+
+    async def serve_forever(self, port:int = None, unix:str = None) -> None:
+        """Starts the server and handles requests until it gets cancelled.
+        """
+        server = await self.start(port, unix)
+        async with server:
+            await server.serve_forever()
+
+    def close(self) -> None:
+        """Stops accepting connections and shuts the worker threads down.
+        """
+        if self.server is not None:
+            self.server.close()
+        self.executor.shutdown(wait=False)
+
+    async def handle_connection(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter) -> None:
+        """Answers the requests of a connection one after another until the client closes it.
+        """
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), self.keep_alive_timeout)
+                except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self._respond(writer, 431, {"error": "Request header too large"}, False)
+                    break
+                try:
+                    method, target, headers, keep_alive = self._parse_head(head)
+                    body = await self._read_body(reader, headers)
+                except HttpError as ex:
+                    await self._respond(writer, ex.status, {"error": ex.message}, False)
+                    break
+                status, payload = await self.dispatch(method, target, body)
+                await self._respond(writer, status, payload, keep_alive)
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def _parse_head(head:bytes) -> tuple:
+        try:
+            lines = head.decode("iso-8859-1").split("\r\n")
+            method, target, version = lines[0].split(" ")
+        except ValueError as ex:
+            raise HttpError(400, "Malformed request line") from ex
+        if not version.startswith("HTTP/1."):
+            raise HttpError(505)
+        headers = {}
+        for line in lines[1:]:
+            if line == "":
+                continue
+            name, separator, value = line.partition(":")
+            if separator == "":
+                raise HttpError(400, "Malformed header")
+            headers[name.strip().lower()] = value.strip()
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.0":
+            keep_alive = connection == "keep-alive"
+        else:
+            keep_alive = connection != "close"
+        return (method.upper(), target, headers, keep_alive)
+
+    @staticmethod
+    async def _read_body(reader:asyncio.StreamReader, headers:dict) -> bytes:
+        if "transfer-encoding" in headers:
+            raise HttpError(411, "Chunked requests are not supported, send a Content-Length")
+        try:
+            length = int(headers.get("content-length", "0"))
+        except ValueError as ex:
+            raise HttpError(400, "Invalid Content-Length") from ex
+        if length < 0:
+            raise HttpError(400, "Invalid Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413)
+        if length == 0:
+            return b""
+        try:
+            return await reader.readexactly(length)
+        except asyncio.IncompleteReadError as ex:
+            raise HttpError(400, "Incomplete body") from ex
+
+    @staticmethod
+    async def _respond(writer:asyncio.StreamWriter, status:int, payload, keep_alive:bool) -> None:
+        body = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        head = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(body)}",
+            "Connection: " + ("keep-alive" if keep_alive else "close")
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("iso-8859-1") + body)
+        # Waits while the client does not read its responses, so a slow client can not fill the memory.
+        await writer.drain()
+
+    async def dispatch(self, method:str, target:str, body:bytes) -> tuple:
+        """Handles a single request.
+
+        Returns:
+            tuple: the status code and the JSON payload (None for no body)
+        """
+        if self.pending >= self.max_pending:
+            return (503, {"error": "Too many pending requests"})
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.executor, self._handle, method, target, body)
+        finally:
+            self.pending -= 1
+
+    def _handle(self, method:str, target:str, body:bytes) -> tuple:
+        try:
+            url = urlsplit(target)
+            parts = [part for part in url.path.split("/") if part != ""]
+            with self.database.lock:
+                if parts == ["status"] and method == "GET":
+                    return (200, {"contacts": len(self.database.contacts), "pending": self.pending})
+                if parts == ["contacts"]:
+                    if method == "GET":
+                        return (200, self.search(parse_qs(url.query)))
+                    if method == "POST":
+                        return (201, self.create(self._json(body)))
+                    raise HttpError(405)
+                if len(parts) == 2 and parts[0] == "contacts":
+                    if method == "GET":
+                        return (200, json_record(self._entry(parts[1])))
+                    if method in ("PUT", "PATCH"):
+                        return (200, self.change(parts[1], self._json(body), method == "PATCH"))
+                    if method == "DELETE":
+                        self.database.delete_entry(self._entry(parts[1]))
+                        return (204, None)
+                    raise HttpError(405)
+                raise HttpError(404)
+        except HttpError as ex:
+            return (ex.status, {"error": ex.message})
+        except Exception as ex: # pylint: disable=broad-except
+            print("PhonebookServer._handle")
+            print(ex)
+            return (500, {"error": str(ex)})
+
+    @staticmethod
+    def _json(body:bytes) -> dict:
+        try:
+            data = json.loads(body.decode("utf-8"))
+        except ValueError as ex:
+            raise HttpError(400, "Body is not valid JSON") from ex
+        if not isinstance(data, dict):
+            raise HttpError(400, "Body has to be a JSON object")
+        data.pop("id", None)
+        return data
+
+    def _entry(self, key:str) -> Entry:
+        if key != basename(key) or not key.endswith(path_config.FILE_EXTENSINON):
+            raise HttpError(404)
+        entry = self.database.registry.get(join(self.database.folder, key))
+        if entry is None:
+            raise HttpError(404)
+        return entry
+
+    @staticmethod
+    def _build(data:dict, file:str, base:dict) -> Entry:
+        data = merge(base, data)
+        errors = type_errors(data, Entry().to_dict())
+        if errors:
+            raise HttpError(400, "; ".join(errors))
+        try:
+            entry = Entry.from_dict(data, file)
+        except ValueError as ex:
+            raise HttpError(400, f"personals.birthday: {ex}") from ex
+        errors = [
+            f"invalid {field} \"{entry.get_field(field)}\""
+            for field in FIELD_PATHS
+            if isinstance(entry.get_field(field), str) and entry.get_field(field) != ""
+            and not validate(field, entry.get_field(field))
+        ]
+        if errors:
+            raise HttpError(422, "; ".join(errors))
+        return entry
+
+    def search(self, params:dict) -> dict:
+        """Returns a page of the result of a search.
+        """
+        search_str = params.get("q", ["*"])[0]
+        limit = _int_param(params, "limit", DEFAULT_LIMIT)
+        offset = _int_param(params, "offset", 0)
+        if search_str.strip() in ("", "*"):
+            entries = self.database.contacts[offset:offset + limit + 1]
+        else:
+            cursor = self.database.search_lazy(search_str)
+            entries = cursor[offset:offset + limit + 1]
+            cursor.close()
+        return {
+            "results": [json_record(entry) for entry in entries[:limit]],
+            "offset": offset,
+            "more": len(entries) > limit
+        }
+
+    def create(self, data:dict) -> dict:
+        """Saves a new entry.
+        """
+        entry = self._build(data, None, Entry().to_dict())
+        if entry.is_empty():
+            raise HttpError(422, "The contact is empty")
+        entry.save()
+        self.database.insert_entry(entry)
+        return json_record(entry)
+
+    def change(self, key:str, data:dict, keep_fields:bool) -> dict:
+        """Replaces or changes the data of an entry.
+        """
+        entry = self._entry(key)
+        base = entry.to_dict() if keep_fields else Entry().to_dict()
+        changed = self._build(data, entry.file, base)
+        entry.read_dict(changed.to_dict())
+        entry.save()
+        self.database.update_entry(entry)
+        return json_record(entry)
+
+
+class _UnixConnection(http.client.HTTPConnection):
+    def __init__(self, path:str, timeout:float) -> None:
+        super().__init__("localhost", timeout=timeout)
+        self.unix_path = path
+
+    def connect(self) -> None:
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class PhonebookClient:
+    """Minimal client of a PhonebookServer reusing one keep-alive connection.
+    """
+
+    def __init__(self, port:int = None, unix:str = None, timeout:float = 30.0) -> None:
+        """Creates the client.
+
+        Args:
+            port (int, optional): the TCP port of the server. Defaults to path_config.SERVER_PORT.
+            unix (str, optional): path of the Unix socket of the server, used instead of the port.
+            timeout (float, optional): Seconds to wait for a response. Defaults to 30.
+        """
+        if unix is not None:
+            self.connection = _UnixConnection(unix, timeout)
+        else:
+            self.connection = http.client.HTTPConnection(HOST, port or path_config.SERVER_PORT, timeout=timeout)
+
+    def request(self, method:str, path:str, data:dict = None) -> tuple:
+        """Sends a request.
+
+        Returns:
+            tuple: the status code and the decoded JSON response (None for no body)
+        """
+        body = None if data is None else json.dumps(data).encode("utf-8")
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        self.connection.request(method, path, body, headers)
+        response = self.connection.getresponse()
+        content = response.read()
+        return (response.status, json.loads(content) if content else None)
+
+    def search(self, search_str:str, limit:int = DEFAULT_LIMIT, offset:int = 0) -> tuple:
+        """Searches the contacts (see PhonebookServer.search).
+        """
+        return self.request("GET", f"/contacts?q={quote(search_str)}&limit={limit}&offset={offset}")
+
+    def get(self, key:str) -> tuple:
+        """Returns a contact by its ID.
+        """
+        return self.request("GET", "/contacts/" + quote(key))
+
+    def create(self, data:dict) -> tuple:
+        """Creates a contact.
+        """
+        return self.request("POST", "/contacts", data)
+
+    def update(self, key:str, data:dict, replace:bool = False) -> tuple:
+        """Changes the given fields of a contact or replaces the whole contact.
+        """
+        return self.request("PUT" if replace else "PATCH", "/contacts/" + quote(key), data)
+
+    def delete(self, key:str) -> tuple:
+        """Deletes a contact.
+        """
+        return self.request("DELETE", "/contacts/" + quote(key))
+
+    def close(self) -> None:
+        """Closes the connection.
+        """
+        self.connection.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import contextlib
+    from database import Database
+    from folder_watcher import FolderWatcher
+
+    def main():
+        """Runs the server from the command line.
+        """
+        parser = argparse.ArgumentParser(description="Serves the phonebook as JSON over HTTP on localhost.")
+        parser.add_argument("--port", type=int, default=path_config.SERVER_PORT, help="TCP port on 127.0.0.1")
+        parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of a port")
+        parser.add_argument("--max-pending", type=int, default=None, help="requests processed at once before answering 503")
+        parser.add_argument("--workers", type=int, default=4, help="threads doing the database work")
+        args = parser.parse_args()
+        with contextlib.redirect_stdout(sys.stderr):
+            database = Database()
+        if path_config.WATCH_FOLDER:
+            FolderWatcher(database).start()
+        server = PhonebookServer(database, args.max_pending, args.workers)
+        print(f"Serving {len(database.contacts)} contacts on " + (args.unix or f"http://{HOST}:{args.port}"))
+        try:
+            asyncio.run(server.serve_forever(args.port, args.unix))
+        except KeyboardInterrupt:
+            print("Server stopped.")
+        finally:
+            server.close()
+    main()
@@ -0,0 +1,342 @@
+"""Contains a read only snapshot of a phonebook that many processes can search at the same time.
+
+One process publishes the contacts into a single immutable file. Reader processes map the file
+into memory instead of parsing every contact file, so all of them share the same pages of the
+operating system cache. Searches run directly on the mapped bytes. Entry objects are only created
+for the rows that are accessed.
+
+The file holds a header, a table of sections and the sections themselves. Every section is a
+blob of UTF-8 values followed by an array with the offset of each row inside the blob. The
+"records" section holds the JSON data of each entry, the other sections hold the lowercase
+values of a search group (see Entry.search_fields) separated by null characters. Rows are stored
+in the order of the contacts list, so sorted row numbers are sorted search results.
+
+A new snapshot replaces the file atomically and gets the next generation number. Readers keep
+using the file they mapped and can check is_stale to find out that a newer one was published.
+
+Usage:
+    python snapshot.py publish [--watch SECONDS]
+    python snapshot.py query SEARCH [--format json|jsonl|csv|vcard] [--limit N]
+    python snapshot.py info
+"""
+
+import os
+import json
+import mmap
+import uuid
+import struct
+from array import array
+from bisect import bisect_right
+from os.path import basename, dirname, join
+
+import path_config
+from entry import Entry, SEARCH_SCOPES, split_search, normalize_phone, email_matches, fsync_folder
+
+
+MAGIC = b"PBSNAP\r\n"
+SNAPSHOT_VERSION = 1
+SEPARATOR = "\x00"
+GROUPS = ("name", "organisation", "address", "address_numbers", "email", "phone", "phone_digits")
+HEADER = struct.Struct("<8sIQII4x")
+"""magic, version, generation, count of rows, count of sections"""
+SECTION = struct.Struct("<16s1s7xQQQ")
+"""name, typecode of the offsets, start of the blob, length of the blob, start of the offsets"""
+
+
+def latest_generation(path:str = None) -> int:
+    """Returns the generation of the snapshot file currently stored at the path.
+
+    Args:
+        path (str, optional): the snapshot file. Defaults to path_config.get_snapshot_path().
+
+    Returns:
+        int: the generation or -1 if there is no valid snapshot
+    """
+    try:
+        with open(path or path_config.get_snapshot_path(), "rb") as file:
+            magic, version, generation, _, _ = HEADER.unpack(file.read(HEADER.size))
+    except (OSError, struct.error):
+        return -1
+    if magic != MAGIC or version != SNAPSHOT_VERSION:
+        return -1
+    return generation
+
+
+def _section(values:list[bytes]) -> tuple:
+    offsets = array("I", [0])
+    total = 0
+    for value in values:
+        total += len(value)
+        if total >= 2 ** 32 and offsets.typecode == "I":
+            offsets = array("Q", offsets)
+        offsets.append(total)
+    return (b"".join(values), offsets)
+
+
+def encode(entries, generation:int = 0) -> list[bytes]:
+    """Encodes entries as snapshot.
+
+    Args:
+        entries (iterable): the sorted entries (e.g. Database.contacts).
+        generation (int, optional): the generation stored in the header. Defaults to 0.
+
+    Returns:
+        list[bytes]: the parts of the file in their order
+    """
+    records = []
+    groups = {group: [] for group in GROUPS}
+    for entry in entries:
+        records.append(json.dumps([basename(entry.file), entry.to_dict()], ensure_ascii=False).encode("utf-8"))
+        for group, values in groups.items():
+            fields = [value.replace(SEPARATOR, "") for value in entry.search_fields(group)]
+            values.append((SEPARATOR.join(fields) + SEPARATOR).encode("utf-8"))
+    sections = [("records", _section(records))] + [(group, _section(groups[group])) for group in GROUPS]
+    parts = []
+    position = HEADER.size + SECTION.size * len(sections)
+    table = []
+    for name, (blob, offsets) in sections:
+        blob_start = position
+        position += len(blob)
+        padding = -position % 8
+        offsets_start = position + padding
+        position = offsets_start + len(offsets) * offsets.itemsize
+        table.append(SECTION.pack(name.encode("ascii"), offsets.typecode.encode("ascii"), blob_start, len(blob), offsets_start))
+        parts.extend([blob, b"\x00" * padding, offsets.tobytes()])
+    header = HEADER.pack(MAGIC, SNAPSHOT_VERSION, generation, len(records), len(sections))
+    return [header] + table + parts
+
+
+def publish(entries, path:str = None) -> int:
+    """Writes a new snapshot and atomically replaces the previous one.
+    Only one process should publish snapshots of a phonebook.
+
+    Args:
+        entries (iterable): the sorted entries (e.g. Database.contacts).
+        path (str, optional): the snapshot file. Defaults to path_config.get_snapshot_path().
+
+    Returns:
+        int: the generation of the new snapshot or -1 if it could not be published
+    """
+    path = path or path_config.get_snapshot_path()
+    generation = latest_generation(path) + 1
+    parts = encode(entries, generation)
+    temp = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temp, "wb") as file:
+            file.writelines(parts)
+            file.flush()
+            os.fsync(file.fileno())
+        # Readers keep the previous file mapped until they refresh.
+        os.replace(temp, path)
+    except OSError as ex:
+        # Windows does not replace files that are still mapped by a reader.
+        print("snapshot.publish")
+        print(ex)
+        if os.path.exists(temp):
+            os.remove(temp)
+        return -1
+    fsync_folder(dirname(path))
+    return generation
+
+
+class Snapshot:
+    """Read only view of a published snapshot. Behaves like the sorted list of entries.
+    The returned entries are copies, changing them does not change the snapshot.
+    """
+
+    def __init__(self, path:str = None) -> None:
+        """Maps a snapshot file into memory.
+
+        Args:
+            path (str, optional): the snapshot file. Defaults to path_config.get_snapshot_path().
+
+        Raises:
+            FileNotFoundError: if no snapshot was published yet
+            ValueError: if the file is not a snapshot of this version
+        """
+        self.path = path or path_config.get_snapshot_path()
+        self.folder = dirname(self.path)
+        with open(self.path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        self._sections = {}
+        try:
+            magic, version, generation, count, section_count = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC or version != SNAPSHOT_VERSION:
+                raise ValueError(f"{self.path} is not a phonebook snapshot of version {SNAPSHOT_VERSION}")
+            self.generation = generation
+            self.count = count
+            view = memoryview(self._map)
+            self._views.append(view)
+            for index in range(section_count):
+                name, typecode, blob_start, blob_length, offsets_start = SECTION.unpack_from(self._map, HEADER.size + index * SECTION.size)
+                typecode = typecode.decode("ascii")
+                offsets_end = offsets_start + (count + 1) * array(typecode).itemsize
+                offsets = view[offsets_start:offsets_end].cast(typecode)
+                self._views.append(offsets)
+                self._sections[name.rstrip(b"\x00").decode("ascii")] = (blob_start, blob_start + blob_length, offsets)
+        except (struct.error, ValueError):
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Unmaps the file. Entries and results of the snapshot can not be used anymore.
+        """
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def is_stale(self) -> bool:
+        """Checks if a newer snapshot was published since this one was mapped.
+        """
+        return latest_generation(self.path) > self.generation
+
+    def refresh(self):
+        """Returns the newest snapshot. If this snapshot is stale a new one gets mapped,
+        this one stays usable until it is closed.
+        """
+        if not self.is_stale():
+            return self
+        return Snapshot(self.path)
+
+    def _value(self, section:str, row:int) -> bytes:
+        start, _, offsets = self._sections[section]
+        return self._map[start + offsets[row]:start + offsets[row + 1]]
+
+    def entry(self, row:int) -> Entry:
+        """Creates the Entry of a row.
+        """
+        name, data = json.loads(self._value("records", row))
+        return Entry.from_dict(data, join(self.folder, name))
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.entry(row) for row in range(*index.indices(self.count))]
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("Snapshot index out of range")
+        return self.entry(index)
+
+    def __iter__(self):
+        for row in range(self.count):
+            yield self.entry(row)
+
+    def find_rows(self, group:str, search_str:str) -> set:
+        """Returns the rows whose values of a search group contain the lowercase search string.
+        """
+        if search_str == "":
+            return set(range(self.count))
+        if SEPARATOR in search_str:
+            return set()
+        needle = search_str.encode("utf-8")
+        start, end, offsets = self._sections[group]
+        rows = set()
+        position = self._map.find(needle, start, end)
+        while position >= 0:
+            row = bisect_right(offsets, position - start) - 1
+            rows.add(row)
+            position = self._map.find(needle, start + offsets[row + 1], end)
+        return rows
+
+    def _find_emails(self, search_str:str) -> set:
+        return {
+            row for row in range(self.count)
+            if any(email_matches(search_str, email) for email in self._value("email", row).decode("utf-8").split(SEPARATOR)[:-1])
+        }
+
+    def search(self, search_str:str):
+        """Returns the entries matching the search string like Database.search does.
+
+        Args:
+            search_str (str): A string to search possible flags: "all:", "#all:", "org:", "add:", "#add:", "#:", "@:"
+
+        Returns:
+            SnapshotResult: Sorted list of entries
+        """
+        prefix, text = split_search(search_str)
+        groups = SEARCH_SCOPES[prefix]
+        if prefix == "#:":
+            digits = normalize_phone(text)
+            if digits != "" or text == "":
+                text = digits
+            else:
+                groups = ("phone",)
+        elif prefix == "@:" and "@" in text:
+            return SnapshotResult(self, sorted(self._find_emails(text)))
+        rows = set()
+        for group in groups:
+            rows |= self.find_rows(group, text)
+        return SnapshotResult(self, sorted(rows))
+
+
+class SnapshotResult:
+    """Sorted search result of a Snapshot creating the entries on access.
+    """
+
+    def __init__(self, snapshot:Snapshot, rows:list[int]) -> None:
+        self.snapshot = snapshot
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self.snapshot.entry(row)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.snapshot.entry(row) for row in self.rows[index]]
+        return self.snapshot.entry(self.rows[index])
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+    import exporter
+    from database import Database
+
+    def main():
+        """Publishes or searches snapshots from the command line.
+        """
+        parser = argparse.ArgumentParser(description="Publishes and searches read only snapshots of the phonebook.")
+        commands = parser.add_subparsers(dest="command", required=True)
+        publish_parser = commands.add_parser("publish", help="writes a snapshot of the phonebook")
+        publish_parser.add_argument("--watch", type=float, default=None, metavar="SECONDS",
+                                    help="keep running and publish a new snapshot whenever the phonebook changed")
+        query_parser = commands.add_parser("query", help="searches the current snapshot")
+        query_parser.add_argument("search", help="the search, using the prefixes of the interactive search")
+        query_parser.add_argument("--format", choices=list(exporter.FORMATS), default="json", help="output format (default: json)")
+        query_parser.add_argument("--limit", type=exporter.parse_limit, default=None, help="maximum count of results (0 for all)")
+        commands.add_parser("info", help="shows the generation and size of the current snapshot")
+        args = parser.parse_args()
+        if args.command == "publish":
+            database = Database()
+            generation = database.publish_snapshot()
+            print(f"Published snapshot {generation} with {len(database.contacts)} contacts.")
+            while args.watch is not None:
+                time.sleep(args.watch)
+                if any(database.sync()):
+                    generation = database.publish_snapshot()
+                    print(f"Published snapshot {generation} with {len(database.contacts)} contacts.")
+        elif args.command == "query":
+            with Snapshot() as snapshot:
+                result = snapshot if args.search.strip() == "*" else snapshot.search(args.search)
+                count = exporter.export(result[:args.limit], sys.stdout, args.format)
+            sys.exit(0 if count > 0 else 1)
+        else:
+            with Snapshot() as snapshot:
+                print(f"Generation {snapshot.generation}: {len(snapshot)} contacts, {os.path.getsize(snapshot.path)} bytes")
+    main()
@@ -0,0 +1,325 @@
+"""Contains a storage backend keeping all entries of the phonebook inside a SQLite database.
+
+Every field of an entry is stored in its own column of the contacts table (see entry.FIELD_PATHS).
+Next to it a FTS5 table using the trigram tokenizer holds the lowercase values of each search
+group (see Entry.search_fields) in one column per group. A search prefix is translated into a
+query on the columns of its groups (see entry.SEARCH_SCOPES), so substring searches are answered
+by the index instead of checking every entry.
+
+Usage:
+    python sqlite_storage.py migrate [--remove]
+    python sqlite_storage.py export [--folder FOLDER]
+    python sqlite_storage.py compact
+"""
+
+import os
+import json
+import sqlite3
+import threading
+from os.path import isfile, join
+
+import path_config
+from entry import Entry, GroupCommit, FIELD_PATHS, SEARCH_SCOPES, split_search, normalize_phone, write_file_atomic
+
+
+SCHEMA_VERSION = 1
+SEARCH_GROUPS = ("name", "organisation", "address", "address_numbers", "email", "phone", "phone_digits")
+COLUMNS = tuple(path.replace(".", "_") for path in FIELD_PATHS)
+MIN_SEARCH_LENGTH = 3
+"""Shortest text the trigram index can search for, shorter searches check every entry."""
+
+
+def to_row(record:dict) -> list:
+    """Returns the column values of the entry data returned by Entry.to_dict (in the order of COLUMNS).
+    """
+    row = []
+    for path in FIELD_PATHS:
+        value = record
+        for name in path.split("."):
+            value = value[name]
+        if path == "personals.birthday":
+            value = "%04d-%02d-%02d" % tuple(value)
+        elif path == "personals.male":
+            value = int(bool(value))
+        elif path == "notes":
+            value = json.dumps(value, ensure_ascii=False)
+        row.append(value)
+    return row
+
+
+def to_record(row) -> dict:
+    """Returns the entry data (like Entry.to_dict) of the column values of a row.
+    """
+    record = {}
+    for path, value in zip(FIELD_PATHS, row):
+        if path == "personals.birthday":
+            value = [int(part) for part in value.split("-")]
+        elif path == "personals.male":
+            value = bool(value)
+        elif path == "notes":
+            value = json.loads(value)
+        target = record
+        names = path.split(".")
+        for name in names[:-1]:
+            target = target.setdefault(name, {})
+        target[names[-1]] = value
+    return record
+
+
+def _phrase(text:str) -> str:
+    return "\"" + text.replace("\"", "\"\"") + "\""
+
+
+def search_query(search_str:str) -> str:
+    """Translates a search into a FTS5 query on the columns of the search groups.
+
+    Args:
+        search_str (str): A string to search possible flags: "all:", "#all:", "org:", "add:", "#add:", "#:", "@:"
+
+    Returns:
+        str: the query or None if the text is to short for the index
+    """
+    prefix, text = split_search(search_str)
+    groups = SEARCH_SCOPES[prefix]
+    if prefix == "#:":
+        digits = normalize_phone(text)
+        if digits != "" or text == "":
+            text = digits
+        else:
+            groups = ("phone",)
+    elif prefix == "@:" and "@" in text:
+        # "name@example.com" also matches "name@mail.example.com", so the parts are searched separately.
+        # Addresses containing the whole text contain both parts as well.
+        local, _, domain = text.rpartition("@")
+        parts = [part for part in (local + "@" if local != "" else "", domain) if len(part) >= MIN_SEARCH_LENGTH]
+        if not parts:
+            return None
+        return "email : (" + " AND ".join(_phrase(part) for part in parts) + ")"
+    if len(text) < MIN_SEARCH_LENGTH:
+        return None
+    return "{" + " ".join(groups) + "} : " + _phrase(text)
+
+
+class SqliteStorage:
+    """Storage backend keeping all entries in a SQLite database with a full text index.
+    Can be used from multiple threads.
+    """
+
+    def __init__(self, path:str) -> None:
+        """Opens or creates a database file.
+
+        Args:
+            path (str): Path of the database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        # Inside WAL mode commits stay durable against crashes of the program without waiting for the disk.
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        if self._connection.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            self._create()
+
+    def _create(self) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS contacts (key TEXT PRIMARY KEY NOT NULL, " + ", ".join(COLUMNS) + ")"
+            )
+            self._connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS contacts_search USING fts5(" +
+                ", ".join(SEARCH_GROUPS) + ", tokenize='trigram')"
+            )
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._connection.execute("COMMIT")
+
+    def keys(self) -> list[str]:
+        """Returns the keys of all entries.
+        """
+        with self._lock:
+            return [key for (key,) in self._connection.execute("SELECT key FROM contacts")]
+
+    def exists(self, key:str) -> bool:
+        """Checks if an entry with the given key exists.
+        """
+        with self._lock:
+            return self._connection.execute("SELECT 1 FROM contacts WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key:str) -> dict:
+        """Returns the data of an entry or None if it does not exist.
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT " + ", ".join(COLUMNS) + " FROM contacts WHERE key = ?", (key,)
+            ).fetchone()
+        return None if row is None else to_record(row)
+
+    def _put(self, key:str, record:dict) -> None:
+        assignments = ", ".join(f"{column} = excluded.{column}" for column in COLUMNS)
+        rowid = self._connection.execute(
+            "INSERT INTO contacts (key, " + ", ".join(COLUMNS) + ") VALUES (?" + ", ?" * len(COLUMNS) + ") " +
+            "ON CONFLICT (key) DO UPDATE SET " + assignments + " RETURNING rowid",
+            [key] + to_row(record)
+        ).fetchone()[0]
+        entry = Entry.from_dict(record, key)
+        values = ["\n".join(entry.search_fields(group)) for group in SEARCH_GROUPS]
+        self._connection.execute("DELETE FROM contacts_search WHERE rowid = ?", (rowid,))
+        self._connection.execute(
+            "INSERT INTO contacts_search (rowid, " + ", ".join(SEARCH_GROUPS) + ") VALUES (?" + ", ?" * len(SEARCH_GROUPS) + ")",
+            [rowid] + values
+        )
+
+    def put(self, key:str, record:dict) -> None:
+        """Stores a new version of an entry.
+        """
+        self.put_many([(key, record)])
+
+    def put_many(self, items) -> None:
+        """Stores multiple entries inside a single transaction.
+
+        Args:
+            items (iterable): tuples of the key and the data of each entry
+        """
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                for key, record in items:
+                    self._put(key, record)
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def delete(self, key:str) -> None:
+        """Deletes an entry.
+        """
+        with self._lock:
+            self._connection.execute("BEGIN")
+            row = self._connection.execute("DELETE FROM contacts WHERE key = ? RETURNING rowid", (key,)).fetchone()
+            if row is not None:
+                self._connection.execute("DELETE FROM contacts_search WHERE rowid = ?", row)
+            self._connection.execute("COMMIT")
+
+    def load_all(self):
+        """Reads all entries.
+
+        Yields:
+            tuple: The key and the data of each entry.
+        """
+        with self._lock:
+            rows = self._connection.execute("SELECT key, " + ", ".join(COLUMNS) + " FROM contacts ORDER BY rowid").fetchall()
+        for row in rows:
+            yield (row[0], to_record(row[1:]))
+
+    def search(self, search_str:str) -> set:
+        """Returns the keys of the entries that might match a search using the full text index.
+        Every matching entry is part of the result, but it may contain entries not matching the search.
+
+        Args:
+            search_str (str): A string to search possible flags: "all:", "#all:", "org:", "add:", "#add:", "#:", "@:"
+
+        Returns:
+            set: the keys or None if the search text is to short to use the index
+        """
+        query = search_query(search_str)
+        if query is None:
+            return None
+        with self._lock:
+            return {
+                key for (key,) in self._connection.execute(
+                    "SELECT contacts.key FROM contacts_search JOIN contacts ON contacts.rowid = contacts_search.rowid " +
+                    "WHERE contacts_search MATCH ?", (query,)
+                )
+            }
+
+    def compact(self) -> None:
+        """Merges the full text index and rebuilds the database file without unused pages.
+        """
+        with self._lock:
+            self._connection.execute("INSERT INTO contacts_search (contacts_search) VALUES ('optimize')")
+            self._connection.execute("VACUUM")
+
+    def close(self) -> None:
+        """Closes the database.
+        """
+        with self._lock:
+            self._connection.close()
+
+
+def migrate_folder(folder:str, sqlite_path:str, remove_files:bool = False) -> int:
+    """Copies all entry files of a folder into a SQLite database.
+
+    Args:
+        folder (str): The folder containing the entry files.
+        sqlite_path (str): Path of the database file.
+        remove_files (bool, optional): Set to True to delete the entry files after they where copied. Defaults to False.
+
+    Returns:
+        int: count of migrated entries
+    """
+    storage = SqliteStorage(sqlite_path)
+    items = []
+    for file in os.listdir(folder):
+        path = join(folder, file)
+        if isfile(path) and file.lower().endswith(path_config.FILE_EXTENSINON):
+            try:
+                with open(path, "r", encoding="utf-8") as iofile:
+                    items.append((file, json.load(iofile)))
+            except (PermissionError, ValueError) as ex:
+                print(f"{file}: {ex}")
+    storage.put_many(items)
+    storage.close()
+    if remove_files:
+        for file, _ in items:
+            os.remove(join(folder, file))
+    return len(items)
+
+
+def export_folder(sqlite_path:str, folder:str) -> int:
+    """Writes all entries of a SQLite database back into entry files, the opposite of migrate_folder.
+    Existing entry files with the same names get replaced.
+
+    Args:
+        sqlite_path (str): Path of the database file.
+        folder (str): The folder to write the entry files to.
+
+    Returns:
+        int: count of written entries
+    """
+    storage = SqliteStorage(sqlite_path)
+    os.makedirs(folder, exist_ok=True)
+    count = 0
+    with GroupCommit():
+        for key, record in storage.load_all():
+            write_file_atomic(join(folder, key), json.dumps(record))
+            count += 1
+    storage.close()
+    return count
+
+
+if __name__ == "__main__":
+    import argparse
+
+    def main():
+        """Command line tool to move the phonebook between the folder and a SQLite database.
+        """
+        parser = argparse.ArgumentParser(description="Manage the phonebook SQLite database.")
+        parser.add_argument("command", choices=["migrate", "export", "compact"])
+        parser.add_argument("--remove", action="store_true", help="delete the entry files after migrating them")
+        parser.add_argument("--folder", default=None, help="target folder of export (default: the phonebook folder)")
+        args = parser.parse_args()
+        if args.command == "migrate":
+            count = migrate_folder(path_config.get_folder_path(), path_config.get_sqlite_path(), args.remove)
+            print(f"Migrated {count} entries into {path_config.get_sqlite_path()}")
+            print("Set STORAGE_BACKEND = \"sqlite\" inside path_config.py to use the database.")
+        elif args.command == "export":
+            folder = args.folder or path_config.get_folder_path()
+            count = export_folder(path_config.get_sqlite_path(), folder)
+            print(f"Exported {count} entries into {folder}")
+            print("Set STORAGE_BACKEND = \"files\" inside path_config.py to use the entry files.")
+        else:
+            storage = SqliteStorage(path_config.get_sqlite_path())
+            storage.compact()
+            storage.close()
+            print(f"Compacted {path_config.get_sqlite_path()}")
+    main()
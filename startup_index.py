@@ -0,0 +1,100 @@
+"""Contains the startup index, a sidecar file inside the phonebook folder that caches
+the data of all entry files so only changed files have to be parsed at startup.
+
+Every record is validated by the modification time and size of its entry file.
+Records of changed, new or deleted files get repaired the next time the index is updated.
+"""
+
+import os
+import json
+import uuid
+
+from entry import Entry
+
+
+INDEX_VERSION = 1
+
+
+class StartupIndex:
+    """Sidecar index mapping each entry file name to its stat values, its summary and its data.
+    """
+
+    def __init__(self, path:str) -> None:
+        """Reads the index file. A missing, outdated or broken index file results in an empty index.
+
+        Args:
+            path (str): Path of the index file.
+        """
+        self.path = path
+        self.records = {}
+        self.changed = False
+        try:
+            with open(path, "r", encoding="utf-8") as iofile:
+                dictionary = json.load(iofile)
+            if dictionary.get("version") == INDEX_VERSION:
+                self.records = dictionary["files"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            self.records = {}
+            self.changed = True
+
+    def lookup(self, name:str, stat:tuple) -> dict:
+        """Returns the record of a file if its stat values did not change since it was indexed.
+
+        Args:
+            name (str): file name of the entry file.
+            stat (tuple): modification time in ns and size of the entry file.
+
+        Returns:
+            dict: the index record or None if the file has to be parsed again
+        """
+        record = self.records.get(name)
+        if record is None or record["mtime"] != stat[0] or record["size"] != stat[1]:
+            return None
+        return record
+
+    @staticmethod
+    def summary(record:dict) -> dict:
+        """Returns the entry summary stored inside an index record.
+        """
+        return {key: value for key, value in record.items() if key not in ("mtime", "size", "record")}
+
+    def update(self, name:str, stat:tuple, entry:Entry) -> None:
+        """Stores the current state of an entry inside the index.
+
+        Args:
+            name (str): file name of the entry file.
+            stat (tuple): modification time in ns and size of the entry file.
+            entry (Entry): the entry loaded from the file.
+        """
+        record = entry.summary()
+        record["mtime"] = stat[0]
+        record["size"] = stat[1]
+        record["record"] = entry.to_dict()
+        self.records[name] = record
+        self.changed = True
+
+    def retain(self, names) -> None:
+        """Drops the records of all files that are not part of the given names.
+        """
+        names = set(names)
+        for name in [name for name in self.records if name not in names]:
+            del self.records[name]
+            self.changed = True
+
+    def save(self) -> None:
+        """Writes the index file if it was changed.
+        """
+        if not self.changed:
+            return
+        # Every writer uses its own temporary file, several processes may save the index at the same time.
+        temp_path = self.path + "." + uuid.uuid4().hex + ".tmp"
+        try:
+            with open(temp_path, "w", encoding="utf-8") as iofile:
+                json.dump({"version": INDEX_VERSION, "files": self.records}, iofile)
+            os.replace(temp_path, self.path)
+            self.changed = False
+        except OSError as ex:
+            print("StartupIndex.save")
+            print(ex)
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
@@ -0,0 +1,88 @@
+"""Runs the query command of main.py in several processes at the same time.
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+from os.path import abspath, dirname, join
+
+ROOT = dirname(dirname(abspath(__file__)))
+PROCESSES = 8
+ROUNDS = 3
+CONTACTS = 20000
+"""Large enough that the processes save the startup index at the same time."""
+
+
+class ConcurrentQueryTest(unittest.TestCase):
+    """Queries of scripts running in parallel share the phonebook folder and its startup index.
+    """
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.home = tempfile.mkdtemp()
+        cls.env = dict(os.environ, HOME=cls.home, USERPROFILE=cls.home)
+        cls.folder = join(cls.home, "phonebook")
+        subprocess.run(
+            [sys.executable, join(ROOT, "generator.py"), str(CONTACTS), "--seed", "1"],
+            env=cls.env, check=True, stdout=subprocess.DEVNULL
+        )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        shutil.rmtree(cls.home, ignore_errors=True)
+
+    def run_queries(self, *args:str) -> list[subprocess.CompletedProcess]:
+        # Pipes would block the processes once the loading progress filled them, so all of them write into files.
+        outputs = [(tempfile.TemporaryFile("w+"), tempfile.TemporaryFile("w+")) for _ in range(PROCESSES)]
+        processes = [
+            subprocess.Popen(
+                [sys.executable, join(ROOT, "main.py"), "query", *args],
+                env=self.env, stdout=stdout, stderr=stderr, text=True
+            )
+            for stdout, stderr in outputs
+        ]
+        results = []
+        for process, (stdout, stderr) in zip(processes, outputs):
+            process.wait(timeout=300)
+            stdout.seek(0)
+            stderr.seek(0)
+            results.append(subprocess.CompletedProcess(process.args, process.returncode, stdout.read(), stderr.read()))
+            stdout.close()
+            stderr.close()
+        return results
+
+    def test_parallel_queries_without_startup_index(self) -> None:
+        for _ in range(ROUNDS):
+            index_path = join(self.folder, "index.json")
+            if os.path.exists(index_path):
+                os.remove(index_path)
+            results = self.run_queries("org:acme")
+            for result in results:
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertNotIn("Traceback", result.stderr)
+            counts = {len(json.loads(result.stdout)) for result in results}
+            self.assertEqual(len(counts), 1)
+            self.assertGreater(counts.pop(), 0)
+            leftovers = [name for name in os.listdir(self.folder) if name.endswith(".tmp")]
+            self.assertEqual(leftovers, [])
+
+    def test_limit(self) -> None:
+        result = subprocess.run(
+            [sys.executable, join(ROOT, "main.py"), "query", "*", "--limit", "5"],
+            env=self.env, capture_output=True, text=True, check=False
+        )
+        self.assertEqual(len(json.loads(result.stdout)), 5)
+        result = subprocess.run(
+            [sys.executable, join(ROOT, "main.py"), "query", "*", "--limit", "-1"],
+            env=self.env, capture_output=True, text=True, check=False
+        )
+        self.assertEqual(result.returncode, 2)
+        self.assertEqual(result.stdout, "")
+
+
+if __name__ == "__main__":
+    unittest.main()